@@ -2,34 +2,57 @@
 
 """Top-level package for Allociné."""
 
-from collections import OrderedDict
+from abc import ABC, ABCMeta, abstractmethod
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime, timedelta, date, time
+from functools import lru_cache
+from datetime import datetime, timedelta, date
+import importlib
+import inspect
 import logging
+import math
+from operator import attrgetter
 import re
-from typing import List, Optional
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
 import unicodedata
+from urllib.parse import urlparse
 
-import backoff
-import jmespath
-import requests
-
-from allocine import nationalities
+# requests, backoff and allocine.nationalities are slow to import: they are imported on first use,
+# so that the CLI starts fast (see tests/test_imports.py)
+from allocine import metrics, tracing
+from allocine.cache import MovieCache, ResponseCache, get_shared_movie_cache
+from allocine.parsing import DEFAULT_DATE_FORMAT, FAST_ACCESSORS
+from allocine.throttle import Throttle, get_shared_throttle
 
 __author__ = """Thibault Ducret"""
 __email__ = 'hello@tducret.com'
 __version__ = '0.0.12'
 
-DEFAULT_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
 BASE_URL = 'http://api.allocine.fr/rest/v3'
 PARTNER_KEY = '000042532791'
+HEADERS = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; \
+                           Intel Mac OS X 10.14; rv:63.0) \
+                           Gecko/20100101 Firefox/63.0',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            }
+DEFAULT_POOL_MAXSIZE = 32  # Max connections kept alive per host
+DEFAULT_TIMEOUT = (5, 30)  # Seconds to connect, and to wait for the response
 
 logger = logging.getLogger(__name__)
 
 
 # === Models ===
+# The models use __slots__ to stay small: a big city has tens of thousands of showtimes
 @dataclass
 class Movie:
+    __slots__ = ('movie_id', 'title', 'original_title', 'rating', 'duration', 'genres',
+                 'countries', 'directors', 'actors', 'synopsis', 'year')
     movie_id: int
     title: str
     original_title: str
@@ -66,17 +89,8 @@ class Movie:
             Example: if self.countries = ['France'] => [('français', 'française')]
         """
         if self.countries:
-            nationality_tuples = []
-            for country_name in self.countries:
-                normalized_country_name = _strip_accents(country_name).lower()
-                country_code = nationalities.countries.get(normalized_country_name)
-
-                if country_code is not None:
-                    nationality_tuples.append(nationalities.nationalities[country_code])
-                else:
-                    logger.warning(f'Country {country_name!r} not found in nationalities')
-                    nationality_tuples.append((f'de {country_name}', f'de {country_name}'))
-            return nationality_tuples
+            from allocine.nationalities import get_nationality  # Cached per country name
+            return [get_nationality(country_name) for country_name in self.countries]
         else:
             return None
 
@@ -92,48 +106,59 @@ class Movie:
         return hash(self.movie_id)
 
 
-@dataclass
-class MovieVersion(Movie):
+@dataclass(frozen=True)
+class MovieVersion:
+    """ A movie in a language and a screen format.
+    All the versions of a movie share the same Movie object,
+    whose attributes are readable from the version (ex: movie_version.title).
+    """
+    __slots__ = ('movie', 'language', 'screen_format', '_key')
+    movie: Movie
     language: str
     screen_format: str
 
-    @property
-    def version(self):
+    def __post_init__(self):
+        # Frozen, so the key used by __eq__ and __hash__ can be computed once
+        object.__setattr__(self, '_key', (self.movie.movie_id, self._get_version()))
+
+    def _get_version(self):
         version = 'VF' if self.language == 'Français' else 'VOST'
         if self.screen_format != 'Numérique':
             version += f' {self.screen_format}'
-        return version
+        return sys.intern(version)
+
+    @property
+    def version(self):
+        return self._key[1]
 
     def get_movie(self):
-        return Movie(
-            movie_id=self.movie_id,
-            title=self.title,
-            rating=self.rating,
-            duration=self.duration,
-            original_title=self.original_title,
-            year=self.year,
-            genres=self.genres,
-            countries=self.countries,
-            directors=self.directors,
-            actors=self.actors,
-            synopsis=self.synopsis,
-        )
+        return self.movie
+
+    def __reduce__(self):
+        # Frozen with __slots__: pickle and copy would assign the fields on a new instance, so rebuild it instead
+        return MovieVersion, (self.movie, self.language, self.screen_format)
 
     def __str__(self):
-        movie_str = super().__str__()
-        return f'{movie_str} ({self.version})'
+        return f'{self.movie} ({self.version})'
 
     def __eq__(self, other):
-        return (self.movie_id, self.version) == (other.movie_id, other.version)
+        return self._key == other._key
 
     def __hash__(self):
         """ This function allows us
         to do a set(list_of_MovieVersion_objects) """
-        return hash((self.movie_id, self.version))
+        return hash(self._key)
+
+
+for _attribute in ('movie_id', 'title', 'original_title', 'rating', 'duration', 'genres', 'countries',
+                   'directors', 'actors', 'synopsis', 'year',
+                   'duration_str', 'duration_short_str', 'rating_str', 'nationalities'):
+    setattr(MovieVersion, _attribute, property(attrgetter(f'movie.{_attribute}')))
 
 
 @dataclass
 class Schedule:
+    __slots__ = ('date_time',)
     date_time: datetime
 
     @property
@@ -173,6 +198,7 @@ def get_hour_short_str(hour: datetime.time) -> str:
 
 @dataclass
 class Showtime(Schedule):
+    __slots__ = ('movie',)
     movie: MovieVersion
 
     def __str__(self):
@@ -204,8 +230,60 @@ def short_day_str(date: date) -> str:
     return day_str(date)[:3]
 
 
+class ShowtimeList(list):
+    """ List of showtimes counting its modifications,
+    so that the indexes of a theater know when they must be rebuilt.
+    The parsed theaters have a ShowtimeList: with a plain list, the indexes are rebuilt for each query.
+    """
+    version = 0
+
+    def _modified(self):
+        self.version += 1
+
+
+def _modifying(method_name):
+    method = getattr(list, method_name)
+
+    def modifying_method(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._modified()
+        return result
+    modifying_method.__name__ = method_name
+    return modifying_method
+
+
+for _method_name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend',
+                     'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(ShowtimeList, _method_name, _modifying(_method_name))
+
+
+@dataclass
+class _ShowtimeIndexes:
+    showtimes_version: int
+    per_date: Dict[date, List[Showtime]]
+    per_movie_version: Dict[MovieVersion, List[Showtime]]
+    per_movie_version_and_date: Dict[tuple, List[Showtime]]
+    movies_per_date: Dict[date, List[MovieVersion]]
+
+    @classmethod
+    def build(cls, showtimes: List[Showtime]):
+        indexes = cls(getattr(showtimes, 'version', None), {}, {}, {}, {})
+        for showtime in showtimes:
+            showtime_date = showtime.date
+            movie_version = showtime.movie
+            indexes.per_date.setdefault(showtime_date, []).append(showtime)
+            indexes.per_movie_version.setdefault(movie_version, []).append(showtime)
+            movie_showtimes = indexes.per_movie_version_and_date.get((movie_version, showtime_date))
+            if movie_showtimes is None:
+                movie_showtimes = indexes.per_movie_version_and_date[(movie_version, showtime_date)] = []
+                indexes.movies_per_date.setdefault(showtime_date, []).append(movie_version)
+            movie_showtimes.append(showtime)
+        return indexes
+
+
 @dataclass
 class Theater:
+    __slots__ = ('theater_id', 'name', 'showtimes', 'address', 'zipcode', 'city', '_indexes')
     theater_id: str
     name: str
     showtimes: List[Showtime]
@@ -213,41 +291,59 @@ class Theater:
     zipcode: str
     city: str
 
+    def __setattr__(self, name, value):
+        if name == 'showtimes':
+            super().__setattr__('_indexes', None)
+        super().__setattr__(name, value)
+
+    def __get_indexes(self) -> _ShowtimeIndexes:
+        """ Showtimes grouped per date and per movie version, built on first use
+        and rebuilt after any modification of the showtimes.
+        Only a ShowtimeList counts its modifications: the indexes of another list are not kept """
+        showtimes = self.showtimes
+        if not isinstance(showtimes, ShowtimeList):
+            return _ShowtimeIndexes.build(showtimes)
+        if self._indexes is None or self._indexes.showtimes_version != showtimes.version:
+            with tracing.span('build_indexes', showtimes=len(showtimes)):
+                self._indexes = _ShowtimeIndexes.build(showtimes)
+        return self._indexes
+
     @property
     def address_str(self):
         address_str = f'{self.address}, ' if self.address else ''
         address_str += f'{self.zipcode} {self.city}'
         return address_str
 
+    def iter_showtimes(self, movie_version: MovieVersion = None, date: date = None) -> Iterator[Showtime]:
+        """ Yields the showtimes, optionally only the ones of a movie version and/or a day """
+        for showtime in self.showtimes:
+            if movie_version is not None and showtime.movie != movie_version:
+                continue
+            if date is not None and showtime.date != date:
+                continue
+            yield showtime
+
     def get_showtimes_of_a_movie(self, movie_version: MovieVersion, date: date = None):
-        movie_showtimes = [showtime for showtime in self.showtimes
-                           if showtime.movie == movie_version]
         if date:
-            return [showtime for showtime in movie_showtimes
-                    if showtime.date == date]
+            return list(self.__get_indexes().per_movie_version_and_date.get((movie_version, date), []))
         else:
-            return movie_showtimes
+            return list(self.__get_indexes().per_movie_version.get(movie_version, []))
 
     def get_showtimes_of_a_day(self, date: date):
-        return get_showtimes_of_a_day(showtimes=self.showtimes, date=date)
+        return list(self.__get_indexes().per_date.get(date, []))
 
     def get_movies_available_for_a_day(self, date: date):
         """ Returns a list of movies available on a specified day """
-        movies = [showtime.movie for showtime in self.get_showtimes_of_a_day(date)]
-        return list(set(movies))
+        return list(self.__get_indexes().movies_per_date.get(date, []))
 
     def get_showtimes_per_movie_version(self):
-        movies = {}
-        for showtime in self.showtimes:
-            if movies.get(showtime.movie) is None:
-                movies[showtime.movie] = []
-            movies[showtime.movie].append(showtime)
-        return movies
+        return {movie_version: list(showtimes)
+                for movie_version, showtimes in self.__get_indexes().per_movie_version.items()}
 
     def get_showtimes_per_movie(self):
         movies = {}
         for showtime in self.showtimes:
-            movie = showtime.movie.get_movie()  # Without language nor screen_format
+            movie = showtime.movie.movie  # Without language nor screen_format
             if movies.get(movie) is None:
                 movies[movie] = []
             movies[movie].append(showtime)
@@ -261,9 +357,9 @@ class Theater:
 
     def filter_showtimes(self, date_min: date = None, date_max: date = None):
         if date_min:
-            self.showtimes = [s for s in self.showtimes if s.date >= date_min]
+            self.showtimes = ShowtimeList(s for s in self.showtimes if s.date >= date_min)
         if date_max:
-            self.showtimes = [s for s in self.showtimes if s.date <= date_max]
+            self.showtimes = ShowtimeList(s for s in self.showtimes if s.date <= date_max)
 
     def __eq__(self, other):
         return (self.theater_id) == (other.theater_id)
@@ -296,8 +392,7 @@ def group_showtimes_per_schedule(showtimes: List[Showtime]):
 
 
 def build_program_str(showtimes: List[Showtime]):
-    schedules = [Schedule(s.date_time) for s in showtimes]
-    return build_weekly_schedule_str(schedules)
+    return build_weekly_schedule_str(showtimes)  # A showtime is a schedule
 
 
 def check_schedules_within_week(schedule_list: List[Schedule]) -> bool:
@@ -346,88 +441,112 @@ def create_weekdays_str(dates: List[date]) -> str:
         return 'sf {}'.format(', '.join([to_french_short_weekday(d) for d in missing_days]))
 
 
-def __get_time_weight_in_list(d: dict) -> timedelta:
-    """ Returns the minimum time weight from the time list contained in the dict values
-        ex: {'key': [time(hour=12), time(hour=9)]} => timedelta(hour=9)
-    """
-    weights = [__get_time_weight(t) for t in d[1]]
-    return min(weights)
+# The weekly schedule is computed on integers:
+# - an hour is a number of minutes since midnight
+# - the days of an hour are a 7-bit mask of weekdays (bit 0 = Monday)
+_MINUTES_PER_DAY = 24 * 60
+_NIGHT_TIME_END = 5 * 60  # From 0h to 5h, a showtime is the end of the evening before
+_EVERYDAY_MASK = 0b1111111
+WEEKLY_SCHEDULE_CACHE_SIZE = 4096
 
 
-def __get_time_weight(t: time) -> timedelta:
-    """ Return a timedelta taking into account night time.
+def _get_time_weight(minutes: int) -> int:
+    """ Return the minutes taking into account night time.
         Basically, it allows to sort a list of times 18h>23h>0h30
         and not 0h30>18h>23h
     """
-    _NIGHT_TIME = [time(hour=0), time(hour=5)]
-    delta = timedelta(hours=t.hour, minutes=t.minute)
-    if t >= min(_NIGHT_TIME) and t <= max(_NIGHT_TIME):
-        delta += timedelta(days=1)
-    return delta
+    return minutes + _MINUTES_PER_DAY if minutes <= _NIGHT_TIME_END else minutes
 
 
-def build_weekly_schedule_str(schedule_list: List[Schedule]) -> str:
-    check_schedules_within_week(schedule_list)
+def _build_weekdays_str(weekdays_mask: int, first_weekday: int) -> str:
+    """ Same as create_weekdays_str, for the weekdays of a week starting on first_weekday """
+    weekdays = [weekday % 7 for weekday in range(first_weekday, first_weekday + 7)
+                if weekdays_mask & (1 << (weekday % 7))]
+    if len(weekdays) == 7:
+        return ''
+    elif len(weekdays) <= 4:
+        return ', '.join([to_french_short_weekday(d) for d in weekdays])
+    else:
+        missing_days = [d for d in range(0, 7) if not weekdays_mask & (1 << d)]
+        return 'sf {}'.format(', '.join([to_french_short_weekday(d) for d in missing_days]))
 
-    _hours_hashmap = {}  # ex: {16h: [Lun, Mar], 17h: [Lun], 17h30: [Lun]}
-    _grouped_date_hashmap = {}  # ex: {[Lun]: [16h, 17h30], [Lun, Mar]: [17h]}
 
-    for s in schedule_list:
+@lru_cache(maxsize=7)
+def _get_weekdays_strs(first_weekday: int) -> List[str]:
+    """ The weekdays string of each weekdays mask, for a week starting on first_weekday
+    (built on first use rather than at import) """
+    return [_build_weekdays_str(weekdays_mask, first_weekday) for weekdays_mask in range(128)]
 
-        if _hours_hashmap.get(s.hour) is None:
-            _hours_hashmap[s.hour] = []
-        _hours_hashmap[s.hour].append(s.date)
 
-    for hour, grouped_dates in _hours_hashmap.items():
-        grouped_dates_str = create_weekdays_str(grouped_dates)
-        if _grouped_date_hashmap.get(grouped_dates_str) is None:
-            _grouped_date_hashmap[grouped_dates_str] = []
-        _grouped_date_hashmap[grouped_dates_str].append(hour)
+def _get_hour_short_str(minutes: int) -> str:
+    # Same as get_hour_short_str. Ex: 9h, 11h, 23h30
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}h{minutes:02d}' if minutes else f'{hours}h'
 
-    # Then sort it chronologically
-    for grouped_dates_str, hours in _grouped_date_hashmap.items():
-        # Sort the hours inside
-        hours = list(set(hours))
-        hours.sort()
-        _grouped_date_hashmap[grouped_dates_str] = hours
 
-    grouped_date_hashmap = OrderedDict()
-    _grouped_date_hashmap = sorted(_grouped_date_hashmap.items(), key=__get_time_weight_in_list)
-    grouped_date_hashmap = OrderedDict(_grouped_date_hashmap)
+def build_weekly_schedule_str(schedule_list: List[Schedule]) -> str:
+    """ Returns the compact program of a week. Ex: 'Mer, Sam 18h15; Ven, Lun, Mar 21h'
+    The strings are memoized per schedule fingerprint (see weekly_schedule_cache_info)
+    """
+    check_schedules_within_week(schedule_list)
+    return _build_weekly_schedule_str(_get_schedule_fingerprint(schedule_list))
 
-    hours_hashmap = OrderedDict()
-    for t in sorted(_hours_hashmap.keys(), key=__get_time_weight):
-        hours_hashmap[t] = _hours_hashmap.get(t)
 
-    different_showtimes = len(grouped_date_hashmap)
+def _get_schedule_fingerprint(schedule_list: List[Schedule]) -> tuple:
+    """ Returns what the weekly schedule string depends on:
+    (the first weekday of the week, the sorted (minutes, weekdays mask) of each hour)
+    """
+    weekdays_masks = {}  # ex: {16h: Lun|Mar, 17h: Lun, 17h30: Lun}
+    first_date = None
+    for s in schedule_list:
+        date_time = s.date_time
+        minutes = date_time.hour * 60 + date_time.minute
+        weekdays_masks[minutes] = weekdays_masks.get(minutes, 0) | (1 << date_time.weekday())
+        schedule_date = date_time.date()
+        if first_date is None or schedule_date < first_date:
+            first_date = schedule_date
+    return first_date.weekday(), tuple(sorted(weekdays_masks.items()))
+
+
+@lru_cache(maxsize=WEEKLY_SCHEDULE_CACHE_SIZE)  # The chains use the same schedules in many theaters
+def _build_weekly_schedule_str(schedule_fingerprint: tuple) -> str:
+    first_weekday, hours_masks = schedule_fingerprint
+    weekdays_masks = dict(hours_masks)
+
+    # The days are listed chronologically, so from the first day of the week
+    weekdays_str = _get_weekdays_strs(first_weekday)
+    hours = sorted(weekdays_masks, key=_get_time_weight)
+
+    if _EVERYDAY_MASK in weekdays_masks.values():
+        # At least one schedule is available everyday
+        hours_str = []
+        for hour in hours:
+            grouped_dates_str = weekdays_str[weekdays_masks[hour]]
+            if grouped_dates_str:
+                hours_str.append(f'{_get_hour_short_str(hour)} ({grouped_dates_str})')
+            else:  # Available everyday
+                hours_str.append(_get_hour_short_str(hour))
+        return ', '.join(hours_str)
 
-    # True if at least one schedule is available everyday
-    some_schedules_available_everyday = grouped_date_hashmap.get('') is not None
+    # The groups of days are sorted by their first hour (with the night time at the end)
+    grouped_hours = {}  # ex: {Lun: [16h, 17h30], Lun|Mar: [17h]}
+    for hour in hours:
+        grouped_hours.setdefault(weekdays_masks[hour], []).append(hour)
 
-    weekly_schedule = ''
+    grouped_schedules = []
+    for weekdays_mask, hours in grouped_hours.items():
+        hours_str = ', '.join([_get_hour_short_str(h) for h in sorted(hours)])
+        grouped_schedules.append(f'{weekdays_str[weekdays_mask]} {hours_str}')
+    return '; '.join(grouped_schedules)
 
-    if some_schedules_available_everyday:
-        for hour, grouped_dates in hours_hashmap.items():
-            hour_str = get_hour_short_str(hour)
-            grouped_dates_str = create_weekdays_str(grouped_dates)
-            if grouped_dates_str:
-                weekly_schedule += f'{hour_str} ({grouped_dates_str}), '
-            else:  # Available everyday
-                weekly_schedule += f'{hour_str}, '
-    else:
-        for grouped_dates, hours in grouped_date_hashmap.items():
-            hours_str = ', '.join([get_hour_short_str(h) for h in hours])
-            if different_showtimes == 1:
-                weekly_schedule += f'{grouped_dates} {hours_str}, '
-            else:
-                if some_schedules_available_everyday:
-                    weekly_schedule += f'{hours_str} ({grouped_dates}), '
-                else:
-                    weekly_schedule += f'{grouped_dates} {hours_str}; '
 
-    if weekly_schedule:
-        weekly_schedule = weekly_schedule[:-2]  # Remove trailing comma
-    return weekly_schedule
+def weekly_schedule_cache_info():
+    """ Hits, misses and size of the cache of the weekly schedule strings """
+    return _build_weekly_schedule_str.cache_info()
+
+
+def weekly_schedule_cache_clear():
+    _build_weekly_schedule_str.cache_clear()
 
 
 def get_showtimes_of_a_day(showtimes: List[Showtime], *, date: date):
@@ -436,159 +555,348 @@ def get_showtimes_of_a_day(showtimes: List[Showtime], *, date: date):
 
 
 # === Main class ===
+class TheaterNotFound(ValueError):
+    """ The API knows no theater for this id (or this geocode) """
+
+
+class TheatersNotFound(TheaterNotFound):
+    """ Some theater ids are unknown.
+    The theaters that were found are still available in the theaters attribute.
+    """
+    def __init__(self, theater_ids: List[str], theaters: Dict[str, Theater]):
+        self.theater_ids = theater_ids
+        self.theaters = theaters
+        super().__init__('Theaters not found: {}. Are these theater ids correct?'.format(
+            ', '.join(repr(theater_id) for theater_id in theater_ids)))
+
+
 class Allocine:
-    def __init__(self, base_url=BASE_URL):
-        self.__client = Client(base_url=base_url)
-        self.__movie_store = {}  # Dict to store the movie info (and avoid useless requests)
+    """ Entry point of the package.
+    max_workers is the number of movie info requests that can be sent concurrently
+    while parsing showtimes (1 = one request after another).
+    movie_cache stores the movie info (by default in memory, shared by all the instances of the client base_url,
+    see allocine.cache.SQLiteMovieCache to keep them between runs).
+    response_cache enables the cache of the API responses in the client
+    (useful to poll the same showtimes, see allocine.cache.ResponseCache).
+    client replaces the default Client (e.g. to serve recorded or synthetic feeds,
+    or to tune its connection pool and timeouts).
+    """
+    def __init__(self, base_url=BASE_URL, max_workers: int = 1, movie_cache: MovieCache = None,
+                 response_cache: ResponseCache = None, client: 'BaseClient' = None):
+        self.__client = client or Client(
+            base_url=base_url,
+            response_cache=response_cache,
+            pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers),  # One connection per worker
+        )
+        # Store of the movie info (to avoid useless requests)
+        self.__movie_store = movie_cache if movie_cache is not None else get_shared_movie_cache(
+            self.__client.base_url)
+        self.max_workers = max_workers
 
     def get_theater(self, theater_id: str):
-        ret = self.__client.get_showtimelist_by_theater_id(theater_id=theater_id)
-        if jmespath.search('feed.totalResults', ret) == 0:
-            raise ValueError(f'Theater not found. Is theater id {theater_id!r} correct?')
-
-        theaters = self.__get_theaters_from_raw_showtimelist(raw_showtimelist=ret)
-        if len(theaters) != 1:
-            raise ValueError('Expecting 1 theater but received {}'.format(len(theaters)))
-
-        return theaters[0]
-
-    def __get_theaters_from_raw_showtimelist(self, raw_showtimelist: dict, distance_max_inclusive: int = 0):
-        theaters = []
-        for theater_showtime in jmespath.search('feed.theaterShowtimes', raw_showtimelist):
-            raw_theater = jmespath.search('place.theater', theater_showtime)
-
-            if raw_theater.get('distance') is not None:
-                # distance is not present when theater ids were used for search
-                if raw_theater.get('distance') > distance_max_inclusive:
-                    # Skip theaters that are above the max distance specified
-                    continue
-
-            raw_showtimes = jmespath.search('movieShowtimes', theater_showtime)
-            showtimes = self.__parse_showtimes(raw_showtimes=raw_showtimes)
-            theater = Theater(
-                theater_id=raw_theater.get('code'),
-                name=raw_theater.get('name'),
-                address=raw_theater.get('address'),
-                zipcode=raw_theater.get('postalCode'),
-                city=raw_theater.get('city'),
-                showtimes=showtimes
-            )
-            theaters.append(theater)
+        with tracing.span('get_theater', theater_id=theater_id):
+            ret = self.__client.get_showtimelist_by_theater_id(theater_id=theater_id)
+            if FAST_ACCESSORS.total_results(ret) == 0:
+                raise TheaterNotFound(f'Theater not found. Is theater id {theater_id!r} correct?')
+
+            theaters = self.__get_theaters_from_raw_showtimelist(raw_showtimelist=ret)
+            if len(theaters) != 1:
+                raise ValueError('Expecting 1 theater but received {}'.format(len(theaters)))
+
+            return theaters[0]
+
+    def get_theaters(self, theater_ids: List[str], batch_size: int = 10) -> Dict[str, Theater]:
+        """ Returns the theaters keyed by id, with one request per batch of batch_size theaters
+        (up to max_workers batches are requested at the same time).
+        Raises TheatersNotFound if some ids are unknown.
+        """
+        theater_ids = list(OrderedDict.fromkeys(theater_ids))  # Removes duplicates
+        if not theater_ids:
+            return {}
+        batches = [theater_ids[i:i + batch_size] for i in range(0, len(theater_ids), batch_size)]
+
+        with tracing.span('get_theaters', theaters=len(theater_ids), batches=len(batches)):
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                batch_pages = list(executor.map(
+                    tracing.propagate(self.__get_showtimelist_pages_by_theater_ids), batches))
+
+            theaters_found = {}
+            movies = {}  # The batches share their Movie objects
+            for pages in batch_pages:
+                for ret in pages:
+                    for theater in self.__get_theaters_from_raw_showtimelist(raw_showtimelist=ret, movies=movies):
+                        theaters_found[theater.theater_id] = theater
+
+        theaters = {theater_id: theaters_found[theater_id]
+                    for theater_id in theater_ids if theater_id in theaters_found}
+        unknown_theater_ids = [theater_id for theater_id in theater_ids if theater_id not in theaters]
+        if unknown_theater_ids:
+            raise TheatersNotFound(theater_ids=unknown_theater_ids, theaters=theaters)
         return theaters
 
-    def search_theaters(self, geocode: int):
-        theaters = []
-        page = 1
-        while True:
-            ret = self.__client.get_showtimelist_from_geocode(geocode=geocode, page=page)
-            total_results = jmespath.search('feed.totalResults', ret)
-            if total_results == 0:
-                raise ValueError(f'Theater not found. Is geocode {geocode!r} correct?')
-
-            theaters_to_parse = jmespath.search('feed.theaterShowtimes', ret)
-            if theaters_to_parse:
-                theaters += self.__get_theaters_from_raw_showtimelist(
+    def __get_showtimelist_pages_by_theater_ids(self, theater_ids: List[str]) -> List[dict]:
+        """ Returns all the pages of the showtimelist of several theaters """
+        ret = self.__client.get_showtimelist_by_theater_id(
+            theater_id=','.join(theater_ids), page=1, count=len(theater_ids))
+        total_results = FAST_ACCESSORS.total_results(ret)
+        pages = [ret]
+        for page in range(2, _get_page_count(total_results, len(theater_ids)) + 1):
+            pages.append(self.__client.get_showtimelist_by_theater_id(
+                theater_id=','.join(theater_ids), page=page, count=len(theater_ids)))
+        return pages
+
+    def __get_theaters_from_raw_showtimelist(self, raw_showtimelist: dict, distance_max_inclusive: int = 0,
+                                             movies: dict = None):
+        raw_theater_showtimes = _get_theater_showtimes(
+            raw_showtimelist=raw_showtimelist,
+            distance_max_inclusive=distance_max_inclusive
+        )
+        self.__prefetch_movie_infos(_get_movie_ids(raw_theater_showtimes))
+        # Without prefetch, the movie info are fetched (one after another) while parsing
+        with tracing.span('parse_theaters', theaters=len(raw_theater_showtimes)):
+            return _parse_theaters(raw_theater_showtimes, get_movie_info=self.get_movie_info, movies=movies)
+
+    def search_theaters(self, geocode: int, page_size: int = 10):
+        """ Returns the theaters of a geocode (see iter_theaters) """
+        with tracing.span('search_theaters', geocode=geocode, page_size=page_size):
+            return list(self.iter_theaters(geocode=geocode, page_size=page_size))
+
+    def iter_theaters(self, geocode: int, page_size: int = 10) -> Iterator[Theater]:
+        """ Yields the theaters of a geocode, as soon as their page is parsed.
+        The first page gives the number of pages, the next ones are requested concurrently
+        (up to max_workers at the same time). A bigger page_size means fewer but bigger requests.
+        Only the pages being requested or parsed are kept in memory.
+        """
+        ret = self.__client.get_showtimelist_from_geocode(geocode=geocode, page=1, count=page_size)
+        total_results = FAST_ACCESSORS.total_results(ret)
+        if total_results == 0:
+            raise TheaterNotFound(f'Theater not found. Is geocode {geocode!r} correct?')
+
+        other_pages = iter(range(2, _get_page_count(total_results, page_size) + 1))
+        requests_in_flight = deque()
+        movies = {}  # The pages share their Movie objects
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def request_next_page():
+                page = next(other_pages, None)
+                if page is not None:
+                    requests_in_flight.append(executor.submit(
+                        tracing.propagate(self.__client.get_showtimelist_from_geocode),
+                        geocode=geocode, page=page, count=page_size))
+
+            for _ in range(self.max_workers):
+                request_next_page()
+
+            while ret is not None:
+                theaters = self.__get_theaters_from_raw_showtimelist(
                     raw_showtimelist=ret,
-                    distance_max_inclusive=0
+                    distance_max_inclusive=0,
+                    movies=movies,
                 )
-                page += 1
-            else:
-                break
+                ret = None  # The raw page is not needed anymore
+                yield from theaters
 
-        return theaters
+                if requests_in_flight:
+                    ret = requests_in_flight.popleft().result()
+                    request_next_page()
 
-    def __parse_showtimes(self, raw_showtimes: dict):
-        showtimes = []
-        for s in raw_showtimes:
-            raw_movie = jmespath.search('onShow.movie', s)
-            language = jmespath.search('version."$"', s)
-            screen_format = jmespath.search('screenFormat."$"', s)
-            duration = raw_movie.get('runtime')
-            duration_obj = timedelta(seconds=duration) if duration else None
+    def get_movie_info(self, movie_id: int):
+        # The threads asking for the same movie at the same time share one request
+        return self.__movie_store.get_or_fetch(movie_id, self.__fetch_movie_info)
+
+    def __fetch_movie_info(self, movie_id: int):
+        with tracing.span('fetch_movie_info', movie_id=movie_id):
+            return self.__client.get_movie_info_by_id(movie_id).get('movie')
+
+    def __prefetch_movie_infos(self, movie_ids: List[int]):
+        """ Fetch concurrently the info of the movies that are not in the store yet """
+        missing_movie_ids = [movie_id for movie_id in movie_ids
+                             if self.__movie_store.get(movie_id) is None]
+        if self.max_workers <= 1 or len(missing_movie_ids) <= 1:
+            return  # get_movie_info will fetch them one by one
+
+        workers = min(self.max_workers, len(missing_movie_ids))
+        with tracing.span('prefetch_movie_infos', movies=len(missing_movie_ids), workers=workers), \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(tracing.propagate(self.get_movie_info), missing_movie_ids))
+
+
+# === Parsing of the raw showtimelist feeds ===
+# get_movie_info is a callable returning the raw movie info of a movie code,
+# so that the same parsing is used by Allocine and allocine.aio.AsyncAllocine.
+# accessors read the fields of the raw feeds (see allocine.parsing)
+def _get_theater_showtimes(raw_showtimelist: dict, distance_max_inclusive: int = 0,
+                           accessors=FAST_ACCESSORS) -> List[dict]:
+    """ Returns the raw theater showtimes of a feed, without the theaters too far away """
+    raw_theater_showtimes = []
+    for theater_showtime in accessors.theater_showtimes(raw_showtimelist) or []:
+        raw_theater = accessors.raw_theater(theater_showtime)
+
+        if raw_theater.get('distance') is not None:
+            # distance is not present when theater ids were used for search
+            if raw_theater.get('distance') > distance_max_inclusive:
+                # Skip theaters that are above the max distance specified
+                continue
+        raw_theater_showtimes.append(theater_showtime)
+    return raw_theater_showtimes
+
+
+def _get_page_count(total_results: Optional[int], page_size: int) -> int:
+    """
+    >>> _get_page_count(21, page_size=10)
+    3
+    >>> _get_page_count(None, page_size=10)
+    0
+    """
+    return math.ceil((total_results or 0) / page_size)
+
+
+def _get_movie_ids(raw_theater_showtimes: List[dict], accessors=FAST_ACCESSORS) -> List[int]:
+    """ Returns the distinct movie codes of raw theater showtimes, in order of appearance """
+    movie_ids = [accessors.movie_code(s)
+                 for theater_showtime in raw_theater_showtimes
+                 for s in accessors.movie_showtimes(theater_showtime) or []]
+    return list(OrderedDict.fromkeys(movie_ids))
+
+
+def _parse_theaters(raw_theater_showtimes: List[dict], get_movie_info: Callable[[int], dict],
+                    accessors=FAST_ACCESSORS, movies: dict = None) -> List[Theater]:
+    movies = {} if movies is None else movies
+    theaters = []
+    sink = metrics.get_sink()
+    for theater_showtime in raw_theater_showtimes:
+        started_at = time.perf_counter()
+        raw_theater = accessors.raw_theater(theater_showtime)
+        raw_showtimes = accessors.movie_showtimes(theater_showtime) or []
+        showtimes = _parse_showtimes(
+            raw_showtimes=raw_showtimes,
+            get_movie_info=get_movie_info,
+            accessors=accessors,
+            movies=movies,
+        )
+        theater = Theater(
+            theater_id=raw_theater.get('code'),
+            name=raw_theater.get('name'),
+            address=raw_theater.get('address'),
+            zipcode=raw_theater.get('postalCode'),
+            city=raw_theater.get('city'),
+            showtimes=showtimes
+        )
+        theaters.append(theater)
+        sink.observe(metrics.THEATER_PARSE_DURATION, time.perf_counter() - started_at)
+    return theaters
 
-            rating = jmespath.search('statistics.userRating', raw_movie)
-            try:
-                rating = float(rating)
-            except (ValueError, TypeError):
-                rating = None
-
-            movie_id = raw_movie.get('code')
-            movie_info = self.get_movie_info(movie_id)
-            countries = jmespath.search('nationality[]."$"', movie_info)
-            year = movie_info.get('productionYear')
-            if year:
-                year = int(year)
-            movie = MovieVersion(
-                movie_id=movie_id,
-                title=raw_movie.get('title'),
-                rating=rating,
+
+def _parse_showtimes(raw_showtimes: dict, get_movie_info: Callable[[int], dict],
+                     accessors=FAST_ACCESSORS, movies: dict = None) -> List[Showtime]:
+    """ movies holds the Movie and MovieVersion objects already built, so that they are shared:
+    keyed by (movie id, runtime, rating), and by ((movie id, runtime, rating), language, screen format).
+    The runtime and the rating are read from each entry (as several entries of a movie could disagree),
+    so the entries of a movie share one Movie as long as they agree.
+    """
+    movies = {} if movies is None else movies
+    showtimes = ShowtimeList()  # Its indexes can be kept by the theater
+    for s in raw_showtimes:
+        raw_movie = accessors.raw_movie(s)
+        movie_id = raw_movie.get('code')
+        movie_key = (movie_id, raw_movie.get('runtime'), accessors.user_rating(raw_movie))
+        language = _intern(accessors.language(s))
+        screen_format = _intern(accessors.screen_format(s))
+
+        movie_version = movies.get((movie_key, language, screen_format))
+        if movie_version is None:
+            movie = movies.get(movie_key)
+            if movie is None:
+                movie = movies[movie_key] = _parse_movie(raw_movie, get_movie_info(movie_id), accessors)
+            movie_version = movies[(movie_key, language, screen_format)] = MovieVersion(
+                movie=movie,
                 language=language,
                 screen_format=screen_format,
-                synopsis=_clean_synopsis(movie_info.get('synopsis')),
-                original_title=movie_info.get('originalTitle'),
-                year=year,
-                countries=countries,
-                genres=', '.join(jmespath.search('genre[]."$"', movie_info)),
-                directors=jmespath.search('castingShort.directors', movie_info),
-                actors=jmespath.search('castingShort.actors', movie_info),
-                duration=duration_obj)
-            for showtimes_of_day in s.get('scr') or []:
-                day = showtimes_of_day.get('d')
-                for one_showtime in showtimes_of_day.get('t'):
-                    datetime_str = '{}T{}:00'.format(day, one_showtime.get('$'))
-                    datetime_obj = _str_datetime_to_datetime_obj(datetime_str)
-                    showtime = Showtime(
-                        date_time=datetime_obj,
-                        movie=movie,
-                    )
-                    showtimes.append(showtime)
-        return showtimes
+            )
 
-    def get_movie_info(self, movie_id: int):
-        movie_info = self.__movie_store.get(movie_id)
-        if movie_info is None:
-            movie_info = self.__client.get_movie_info_by_id(movie_id).get('movie')
-            self.__movie_store[movie_id] = movie_info
-        return movie_info
+        for showtimes_of_day in s.get('scr') or []:
+            day = showtimes_of_day.get('d')
+            for one_showtime in showtimes_of_day.get('t'):
+                showtime = Showtime(
+                    date_time=accessors.showtime_datetime(day, one_showtime.get('$')),
+                    movie=movie_version,
+                )
+                showtimes.append(showtime)
+    return showtimes
+
+
+def _parse_movie(raw_movie: dict, movie_info: dict, accessors=FAST_ACCESSORS) -> Movie:
+    duration = raw_movie.get('runtime')
+    duration_obj = timedelta(seconds=duration) if duration else None
+
+    rating = accessors.user_rating(raw_movie)
+    try:
+        rating = float(rating)
+    except (ValueError, TypeError):
+        rating = None
+
+    countries = accessors.countries(movie_info)
+    if countries:
+        countries = [_intern(country) for country in countries]
+    year = movie_info.get('productionYear')
+    if year:
+        year = int(year)
+    return Movie(
+        movie_id=raw_movie.get('code'),
+        title=raw_movie.get('title'),
+        rating=rating,
+        synopsis=_clean_synopsis(movie_info.get('synopsis')),
+        original_title=movie_info.get('originalTitle'),
+        year=year,
+        countries=countries,
+        genres=_intern(', '.join(accessors.genres(movie_info) or [])),
+        directors=accessors.directors(movie_info),
+        actors=accessors.actors(movie_info),
+        duration=duration_obj)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """ Languages, screen formats, genres and countries come back for every movie:
+    only one copy of each is kept in memory """
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 # === Client to execute requests with Allociné APIs ===
-class SingletonMeta(type):
-    _instance = None
-
-    def __call__(self, *args, **kwargs):
-        if self._instance is None:
-            self._instance = super().__call__(*args, **kwargs)
-        return self._instance
+class SingletonMeta(ABCMeta):
+    """ One instance per distinct set of constructor arguments (e.g. one client per base_url),
+    created once even if several threads ask for it at the same time """
+
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        cls._instances = {}
+        cls._instances_lock = threading.Lock()
+
+    def __call__(cls, *args, **kwargs):
+        arguments = inspect.signature(cls.__init__).bind(None, *args, **kwargs)
+        arguments.apply_defaults()
+        key = tuple(arguments.arguments.items())[1:]  # Without self
+        instance = cls._instances.get(key)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.get(key)
+                if instance is None:
+                    instance = cls._instances[key] = super().__call__(*args, **kwargs)
+        return instance
+
+    def clear_instances(cls):
+        """ The next calls create new instances """
+        with cls._instances_lock:
+            cls._instances.clear()
 
 
 class Error503(Exception):
     pass
 
 
-class Client(metaclass=SingletonMeta):
-    """ Client to process the requests with allocine APIs.
-    This is a singleton to avoid the creation of a new session for every theater.
+class BaseClient(ABC):
+    """ Urls of the Allociné APIs, shared by Client and allocine.aio.AsyncClient.
+    The methods return what self._get returns (a coroutine for the async client).
     """
-    def __init__(self, base_url):
-        self.base_url = base_url
-        headers = {
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; \
-                                   Intel Mac OS X 10.14; rv:63.0) \
-                                   Gecko/20100101 Firefox/63.0',
-                    }
-        self.session = requests.session()
-        self.session.headers.update(headers)
-
-    @backoff.on_exception(backoff.expo, Error503, max_tries=5, max_time=30)
-    def _get(self, url: str, expected_status: int = 200, *args, **kwargs):
-        ret = self.session.get(url, *args, **kwargs)
-        if ret.status_code != expected_status:
-            if ret.status_code == 503:
-                raise Error503
-            raise ValueError('{!r} : expected status {}, received {}'.format(
-                url, expected_status, ret.status_code))
-        return ret.json()
+    base_url: str
 
     def get_showtimelist_by_theater_id(self, theater_id: str, page: int = 1, count: int = 10):
         url = (
@@ -614,6 +922,137 @@ class Client(metaclass=SingletonMeta):
         )
         return self._get(url=url)
 
+    @abstractmethod
+    def _get(self, url: str, expected_status: int = 200, *args, **kwargs):
+        """ The decoded JSON answer of url """
+
+
+def _get_endpoint(url: str) -> str:
+    """ Name of the API endpoint of a url, for the metrics
+    >>> _get_endpoint('http://api.allocine.fr/rest/v3/showtimelist?partner=1&format=json&geocode=2')
+    'showtimelist_geocode'
+    >>> _get_endpoint('http://api.allocine.fr/rest/v3/movie?partner=1&format=json&code=3')
+    'movie'
+    """
+    path, _, query = url.partition('?')
+    endpoint = path.rsplit('/', 1)[-1]
+    if endpoint == 'showtimelist':
+        endpoint += '_geocode' if 'geocode=' in query else '_theaters'
+    return endpoint
+
+
+def _record_retry(details: dict):
+    """ Called by backoff before retrying Client._get """
+    url = details['kwargs'].get('url') or details['args'][1]
+    endpoint = _get_endpoint(url)
+    sink = metrics.get_sink()
+    sink.increment(metrics.RETRIES, endpoint=endpoint)
+    sink.increment(metrics.RETRY_WAIT, details['wait'], endpoint=endpoint)
+
+
+@lru_cache(maxsize=None)
+def _with_retries(function: Callable) -> Callable:
+    """ function retried on Error503, decorated on the first request (backoff imports asyncio) """
+    import backoff
+    return backoff.on_exception(backoff.expo, Error503, max_tries=5, max_time=30, on_backoff=_record_retry)(function)
+
+
+class Client(BaseClient, metaclass=SingletonMeta):
+    """ Client to process the requests with allocine APIs.
+    There is one client per base_url (and per set of arguments), to avoid the creation
+    of a new session for every theater. Its keep-alive connections can be used by many threads:
+    - pool_connections: number of hosts whose connections are kept
+    - pool_maxsize: max connections kept alive per host (at least the number of threads,
+      otherwise the extra connections are discarded after each request)
+    - pool_block: wait for a free connection instead of opening an extra one
+    - timeout: (connect, read) timeouts in seconds
+    - throttle: adaptive limits of the request rate and concurrency, shared by all the threads
+      (see allocine.throttle.Throttle, and client.throttle.limits for the current limits).
+      By default, all the clients of a host share one throttle, whatever their other arguments
+    """
+    def __init__(self, base_url, response_cache: ResponseCache = None, pool_connections: int = 10,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE, pool_block: bool = False, timeout=DEFAULT_TIMEOUT,
+                 throttle: Throttle = None):
+        self.base_url = base_url
+        self.response_cache = response_cache  # No cache by default
+        self.timeout = timeout
+        self.throttle = throttle if throttle is not None else get_shared_throttle(urlparse(base_url).netloc)
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _get(self, url: str, expected_status: int = 200, *args, **kwargs):
+        """ GET url (retried with an exponential backoff while the API answers 503) """
+        return _with_retries(Client._get_once)(self, url, expected_status, *args, **kwargs)
+
+    def _get_once(self, url: str, expected_status: int = 200, *args, **kwargs):
+        import requests  # Already imported by __init__
+        sink = metrics.get_sink()
+        endpoint = _get_endpoint(url)
+        cached_response = None
+        if self.response_cache is not None:
+            cached_response = self.response_cache.get(url)
+            if cached_response is not None:
+                if self.response_cache.is_fresh(cached_response):
+                    sink.increment(metrics.RESPONSE_CACHE, endpoint=endpoint, result='fresh')
+                    return cached_response.payload
+                kwargs['headers'] = {**cached_response.validators, **kwargs.get('headers', {})}
+
+        kwargs.setdefault('timeout', self.timeout)
+        with tracing.span('request', endpoint=endpoint) as request_span:
+            started_at = self.throttle.acquire()
+            overloaded = False
+            status = 'error'  # No answer
+            try:
+                ret = self.session.get(url, *args, **kwargs)
+                status = ret.status_code
+                overloaded = status == 503
+            except requests.exceptions.Timeout:
+                overloaded = True
+                raise
+            finally:
+                self.throttle.release(started_at, overloaded=overloaded, endpoint=endpoint)
+                sink.increment(metrics.REQUESTS, endpoint=endpoint, status=status)
+                sink.observe(metrics.REQUEST_DURATION, time.monotonic() - started_at, endpoint=endpoint)
+                request_span.set_attribute('status', status)
+        if ret.status_code == 304 and cached_response is not None:
+            sink.increment(metrics.RESPONSE_CACHE, endpoint=endpoint, result='not_modified')
+            self.response_cache.refresh(url)
+            return cached_response.payload
+        if ret.status_code != expected_status:
+            if ret.status_code == 503:
+                raise Error503
+            raise ValueError('{!r} : expected status {}, received {}'.format(
+                url, expected_status, ret.status_code))
+
+        sink.observe(metrics.RESPONSE_SIZE, len(ret.content), endpoint=endpoint)
+        decode_started_at = time.perf_counter()
+        with tracing.span('decode_json', endpoint=endpoint, size=len(ret.content)):
+            payload = ret.json()
+        sink.observe(metrics.JSON_DECODE_DURATION, time.perf_counter() - decode_started_at, endpoint=endpoint)
+        if self.response_cache is not None:
+            self.response_cache.set(
+                url,
+                payload,
+                etag=ret.headers.get('ETag'),
+                last_modified=ret.headers.get('Last-Modified'),
+            )
+        return payload
+
+
+_LAZY_SUBMODULES = ('nationalities',)
+
+
+def __getattr__(name):
+    """ allocine.nationalities is imported on first use """
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 def _strfdelta(tdelta, fmt):
     """ Format a timedelta object """
@@ -641,9 +1080,3 @@ def _clean_synopsis(raw_synopsis):
     synopsis = _cleanhtml(raw_synopsis)  # Remove HTML tags (ex: <span>)
     synopsis = synopsis.replace('\xa0', ' ')
     return unicodedata.normalize("NFKD", synopsis)
-
-
-def _strip_accents(s):
-    # https://stackoverflow.com/a/518232/8748757
-    return ''.join(c for c in unicodedata.normalize('NFD', s)
-                   if unicodedata.category(c) != 'Mn')
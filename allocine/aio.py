@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""asyncio counterpart of Allocine and Client.
+
+Requires aiohttp (pip install allocine[async]).
+
+Example:
+    async with AsyncAllocine() as allocine:
+        theaters = await asyncio.gather(*[allocine.get_theater(i) for i in theater_ids])
+"""
+
+import asyncio
+
+import aiohttp
+import backoff
+
+from allocine import (
+    metrics,
+    BASE_URL,
+    HEADERS,
+    BaseClient,
+    Error503,
+    TheaterNotFound,
+    _get_movie_ids,
+    _get_page_count,
+    _get_theater_showtimes,
+    _parse_theaters,
+)
+from allocine.cache import MovieCache, get_shared_movie_cache
+from allocine.parsing import FAST_ACCESSORS
+
+
+class AsyncAllocine:
+    def __init__(self, base_url=BASE_URL, client: 'AsyncClient' = None, movie_cache: MovieCache = None):
+        self.__client = client or AsyncClient(base_url=base_url)
+        # Store of the movie info (to avoid useless requests)
+        self.__movie_store = movie_cache if movie_cache is not None else get_shared_movie_cache(
+            self.__client.base_url)
+        self.__movie_requests = {}  # Movie info requests in flight, shared by the concurrent parsings
+
+    async def get_theater(self, theater_id: str):
+        ret = await self.__client.get_showtimelist_by_theater_id(theater_id=theater_id)
+        if FAST_ACCESSORS.total_results(ret) == 0:
+            raise TheaterNotFound(f'Theater not found. Is theater id {theater_id!r} correct?')
+
+        theaters = await self.__get_theaters_from_raw_showtimelist(raw_showtimelist=ret)
+        if len(theaters) != 1:
+            raise ValueError('Expecting 1 theater but received {}'.format(len(theaters)))
+
+        return theaters[0]
+
+    async def __get_theaters_from_raw_showtimelist(self, raw_showtimelist: dict, distance_max_inclusive: int = 0,
+                                                   movies: dict = None):
+        raw_theater_showtimes = _get_theater_showtimes(
+            raw_showtimelist=raw_showtimelist,
+            distance_max_inclusive=distance_max_inclusive
+        )
+        movie_ids = _get_movie_ids(raw_theater_showtimes)
+        movie_infos = await asyncio.gather(*[self.get_movie_info(movie_id) for movie_id in movie_ids])
+        movie_infos = dict(zip(movie_ids, movie_infos))
+        return _parse_theaters(raw_theater_showtimes, get_movie_info=movie_infos.__getitem__, movies=movies)
+
+    async def search_theaters(self, geocode: int, page_size: int = 10):
+        ret = await self.__client.get_showtimelist_from_geocode(geocode=geocode, page=1, count=page_size)
+        total_results = FAST_ACCESSORS.total_results(ret)
+        if total_results == 0:
+            raise TheaterNotFound(f'Theater not found. Is geocode {geocode!r} correct?')
+
+        other_pages = range(2, _get_page_count(total_results, page_size) + 1)
+        pages = [ret] + list(await asyncio.gather(*[
+            self.__client.get_showtimelist_from_geocode(geocode=geocode, page=page, count=page_size)
+            for page in other_pages
+        ]))
+
+        theaters = []
+        movies = {}  # The pages share their Movie objects
+        for ret in pages:
+            theaters += await self.__get_theaters_from_raw_showtimelist(
+                raw_showtimelist=ret,
+                distance_max_inclusive=0,
+                movies=movies,
+            )
+        return theaters
+
+    async def get_movie_info(self, movie_id: int):
+        movie_info = self.__movie_store.get(movie_id)
+        if movie_info is None:
+            request = self.__movie_requests.get(movie_id)
+            if request is None:
+                metrics.get_sink().increment(metrics.MOVIE_CACHE, result='miss')
+                request = asyncio.ensure_future(self.__client.get_movie_info_by_id(movie_id))
+                self.__movie_requests[movie_id] = request
+            else:
+                metrics.get_sink().increment(metrics.MOVIE_CACHE, result='shared')
+            try:
+                # Shielded so that a cancelled caller does not cancel the request of the others
+                raw_movie = await asyncio.shield(request)
+            finally:
+                self.__movie_requests.pop(movie_id, None)
+            movie_info = raw_movie.get('movie')
+            self.__movie_store.set(movie_id, movie_info)
+        else:
+            metrics.get_sink().increment(metrics.MOVIE_CACHE, result='hit')
+        return movie_info
+
+    async def close(self):
+        await self.__client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AsyncClient(BaseClient):
+    """ Client to process the requests with allocine APIs, with aiohttp.
+    All the requests share one connection pool:
+    limit is the max number of simultaneous connections (0 = no limit),
+    limit_per_host the max number of connections to the same host.
+    """
+    def __init__(self, base_url=BASE_URL, limit: int = 100, limit_per_host: int = 0):
+        self.base_url = base_url
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._session = None  # Created on first use, inside the running event loop
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(headers=HEADERS, connector=connector)
+        return self._session
+
+    @backoff.on_exception(backoff.expo, Error503, max_tries=5, max_time=30)
+    async def _get(self, url: str, expected_status: int = 200, *args, **kwargs):
+        async with self.session.get(url, *args, **kwargs) as ret:
+            if ret.status != expected_status:
+                if ret.status == 503:
+                    raise Error503
+                raise ValueError('{!r} : expected status {}, received {}'.format(
+                    url, expected_status, ret.status))
+            return await ret.json(content_type=None)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""Caches for the movie info (used by Allocine.get_movie_info)
+and for the API responses (used by Client)."""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import timedelta
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from allocine import metrics
+
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'allocine' / 'movies.sqlite'
+
+
+class SingleFlight:
+    """ Concurrent calls with the same key share one execution of the function, and its result.
+    do returns the result, and whether it was shared with a call in flight.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key => Future of the call in flight
+        self._lock = threading.Lock()
+
+    def do(self, key, function: Callable, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._calls[key] = Future()
+        if not is_leader:
+            return future.result(), True
+
+        try:
+            result = function(*args)
+        except BaseException as exception:
+            future.set_exception(exception)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class MovieCache(ABC):
+    """ Interface of the movie info caches (movie_id => raw movie info).
+    A cache can be shared by several Allocine instances, and used by several threads.
+    """
+
+    def __init__(self):
+        self._single_flight = SingleFlight()
+
+    @abstractmethod
+    def get(self, movie_id: int) -> Optional[dict]:
+        """ The cached movie info, or None """
+
+    @abstractmethod
+    def set(self, movie_id: int, movie_info: dict, ttl: timedelta = None):
+        """ Stores the movie info (for ttl, if given) """
+
+    def get_or_fetch(self, movie_id: int, fetch: Callable[[int], Optional[dict]]) -> Optional[dict]:
+        """ Returns the cached movie info, or fetches and stores it.
+        Concurrent calls for the same movie share one fetch.
+        """
+        movie_info = self.get(movie_id)
+        if movie_info is not None:
+            metrics.get_sink().increment(metrics.MOVIE_CACHE, result='hit')
+            return movie_info
+        movie_info, shared = self._single_flight.do(movie_id, self._fetch_and_set, movie_id, fetch)
+        if shared:
+            metrics.get_sink().increment(metrics.MOVIE_CACHE, result='shared')
+        return movie_info
+
+    def _fetch_and_set(self, movie_id: int, fetch: Callable[[int], Optional[dict]]) -> Optional[dict]:
+        movie_info = self.get(movie_id)  # Stored by a fetch that just ended
+        if movie_info is None:
+            metrics.get_sink().increment(metrics.MOVIE_CACHE, result='miss')
+            movie_info = fetch(movie_id)
+            self.set(movie_id, movie_info)
+        else:
+            metrics.get_sink().increment(metrics.MOVIE_CACHE, result='hit')
+        return movie_info
+
+
+class MemoryMovieCache(MovieCache):
+    """ In memory, for the life of the process.
+    The default cache is shared by all the Allocine instances of a base_url (see get_shared_movie_cache).
+    max_entries: when exceeded, the least recently used movies are evicted
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._movies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, movie_id: int) -> Optional[dict]:
+        with self._lock:
+            movie_info = self._movies.get(movie_id)
+            if movie_info is not None:
+                self._movies.move_to_end(movie_id)
+            return movie_info
+
+    def set(self, movie_id: int, movie_info: dict, ttl: timedelta = None):
+        with self._lock:
+            self._movies[movie_id] = movie_info
+            self._movies.move_to_end(movie_id)
+            while len(self._movies) > self.max_entries:
+                self._movies.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._movies.clear()
+
+    def __len__(self):
+        return len(self._movies)
+
+
+class SQLiteMovieCache(MovieCache):
+    """ Movie info stored in a SQLite database, to be reused by the next runs.
+    It can be shared by several processes (SQLite locks the database file).
+    - ttl: how long an entry is valid (can be overridden per entry in set)
+    - max_entries: when exceeded, the entries closest to expiration are evicted
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl: timedelta = timedelta(days=30), max_entries: int = 10000):
+        super().__init__()
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():  # Do not reuse a connection after a fork
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS movies ('
+                'movie_id INTEGER PRIMARY KEY, movie_info TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS movies_expires_at ON movies (expires_at)')
+            connection.commit()
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, movie_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT movie_info FROM movies WHERE movie_id = ? AND expires_at > ?',
+                (movie_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, movie_id: int, movie_info: dict, ttl: timedelta = None):
+        if movie_info is None:
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        now = time.time()
+        with self._lock, self.connection as connection:  # One transaction
+            connection.execute(
+                'INSERT OR REPLACE INTO movies (movie_id, movie_info, expires_at) VALUES (?, ?, ?)',
+                (movie_id, json.dumps(movie_info), now + ttl.total_seconds())
+            )
+            connection.execute('DELETE FROM movies WHERE expires_at <= ?', (now,))
+            connection.execute(
+                'DELETE FROM movies WHERE movie_id IN ('
+                'SELECT movie_id FROM movies ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute('SELECT COUNT(*) FROM movies').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_SHARED_MOVIE_CACHES: Dict[str, MemoryMovieCache] = {}
+_SHARED_MOVIE_CACHES_LOCK = threading.Lock()
+
+
+def get_shared_movie_cache(base_url: str) -> MemoryMovieCache:
+    """ The default movie cache of the Allocine instances of base_url
+    (another base_url, e.g. a stub server, may serve other movies under the same ids) """
+    with _SHARED_MOVIE_CACHES_LOCK:
+        movie_cache = _SHARED_MOVIE_CACHES.get(base_url)
+        if movie_cache is None:
+            movie_cache = _SHARED_MOVIE_CACHES[base_url] = MemoryMovieCache()
+        return movie_cache
+
+
+def clear_shared_movie_caches():
+    """ The next Allocine instances start with empty default caches """
+    with _SHARED_MOVIE_CACHES_LOCK:
+        _SHARED_MOVIE_CACHES.clear()
+
+
+@dataclass
+class CachedResponse:
+    payload: dict  # Decoded JSON, shared by all the callers: do not modify it
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    @property
+    def validators(self) -> dict:
+        """ Headers of a conditional request, answered by a 304 if the response did not change """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """ In-memory cache of the API responses, keyed by url.
+    - fresh_ttl: during this delay, a response is served without any request
+    - after that, a conditional request is sent (with If-None-Match / If-Modified-Since)
+      and the cached response is served again if the API answers 304 Not Modified
+    - max_entries: when exceeded, the least recently used responses are evicted
+    """
+
+    def __init__(self, fresh_ttl: timedelta = timedelta(0), max_entries: int = 1000):
+        self.fresh_ttl = fresh_ttl
+        self.max_entries = max_entries
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        with self._lock:
+            response = self._responses.get(url)
+            if response is not None:
+                self._responses.move_to_end(url)
+            return response
+
+    def is_fresh(self, response: CachedResponse) -> bool:
+        return time.time() - response.stored_at < self.fresh_ttl.total_seconds()
+
+    def set(self, url: str, payload: dict, etag: str = None, last_modified: str = None):
+        with self._lock:
+            self._responses[url] = CachedResponse(
+                payload=payload,
+                etag=etag,
+                last_modified=last_modified,
+                stored_at=time.time(),
+            )
+            self._responses.move_to_end(url)
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+
+    def refresh(self, url: str):
+        """ The API confirmed that the cached response is still valid """
+        with self._lock:
+            response = self._responses.get(url)
+            if response is not None:
+                response.stored_at = time.time()
+
+    def __len__(self):
+        return len(self._responses)
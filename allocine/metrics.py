@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""Metrics of the requests, of the parsing and of the movie cache.
+
+The metrics are sent to a sink, which ignores them by default. To record them in memory:
+
+    from allocine import metrics
+    registry = metrics.MetricsRegistry()
+    metrics.set_sink(registry)
+    ...
+    print(registry.to_prometheus())  # Prometheus text format
+
+Any object with the increment and observe methods of MetricsSink can be used as a sink
+(e.g. to forward the metrics to statsd).
+"""
+
+from bisect import bisect_left
+import threading
+from typing import Dict, Tuple
+
+# Names of the metrics => (type, help)
+REQUESTS = 'allocine_requests_total'
+REQUEST_DURATION = 'allocine_request_duration_seconds'
+RESPONSE_SIZE = 'allocine_response_size_bytes'
+JSON_DECODE_DURATION = 'allocine_json_decode_duration_seconds'
+RETRIES = 'allocine_retries_total'
+RETRY_WAIT = 'allocine_retry_wait_seconds_total'
+RESPONSE_CACHE = 'allocine_response_cache_total'
+THEATER_PARSE_DURATION = 'allocine_theater_parse_duration_seconds'
+MOVIE_CACHE = 'allocine_movie_cache_total'
+
+METRICS = {
+    REQUESTS: ('counter', 'Requests to the API, per endpoint and status'),
+    REQUEST_DURATION: ('histogram', 'Duration of the requests to the API, per endpoint'),
+    RESPONSE_SIZE: ('histogram', 'Size of the API responses, per endpoint'),
+    JSON_DECODE_DURATION: ('histogram', 'Duration of the JSON decoding of the API responses, per endpoint'),
+    RETRIES: ('counter', 'Requests retried after a 503 answer, per endpoint'),
+    RETRY_WAIT: ('counter', 'Time waited before retrying the requests, per endpoint'),
+    RESPONSE_CACHE: ('counter', 'Responses served by the response cache (fresh or not modified), per endpoint'),
+    THEATER_PARSE_DURATION: ('histogram', 'Duration of the parsing of the showtimes of a theater'),
+    MOVIE_CACHE: ('counter', 'Movie info lookups, per result (hit, miss or shared with a lookup in flight)'),
+}
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BUCKETS = {
+    RESPONSE_SIZE: SIZE_BUCKETS,
+}
+
+
+class MetricsSink:
+    """ Receives the metrics (ignores them: this is the default sink) """
+
+    def increment(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+
+class MetricsRegistry(MetricsSink):
+    """ Keeps the metrics in memory, keyed by name and labels """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[tuple, float]] = {}
+        self.histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _get_key(labels)
+        with self._lock:
+            counters = self.counters.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _get_key(labels)
+        with self._lock:
+            histograms = self.histograms.setdefault(name, {})
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(BUCKETS.get(name, DURATION_BUCKETS))
+            histogram.observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self.counters.get(name, {}).get(_get_key(labels), 0)
+
+    def get_histogram(self, name: str, **labels) -> Histogram:
+        with self._lock:
+            return self.histograms.get(name, {}).get(_get_key(labels))
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_prometheus(self) -> str:
+        """ The metrics in the Prometheus text exposition format """
+        lines = []
+        with self._lock:
+            for name in sorted(set(self.counters) | set(self.histograms)):
+                metric_type, metric_help = METRICS.get(name, ('counter' if name in self.counters else 'histogram', ''))
+                lines.append(f'# HELP {name} {metric_help}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for key, value in sorted(self.counters.get(name, {}).items()):
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+                for key, histogram in sorted(self.histograms.get(name, {}).items()):
+                    bounds = [_format_value(bound) for bound in histogram.buckets] + ['+Inf']
+                    for bound, count in zip(bounds, histogram.cumulative_counts()):
+                        lines.append(f'{name}_bucket{_format_labels(key + (("le", bound),))} {count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}')
+                    lines.append(f'{name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _get_key(labels: dict) -> tuple:
+    """ The labels sorted by name, with their values as strings (a status is 200 or 'error')
+    >>> _get_key({'status': 200, 'endpoint': 'movie'})
+    (('endpoint', 'movie'), ('status', '200'))
+    """
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: tuple) -> str:
+    """
+    >>> _format_labels((('endpoint', 'movie'), ('status', 200)))
+    '{endpoint="movie",status="200"}'
+    >>> _format_labels(())
+    ''
+    """
+    if not key:
+        return ''
+    labels = ','.join('{}="{}"'.format(
+        label, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for label, value in key)
+    return '{' + labels + '}'
+
+
+def _format_value(value: float) -> str:
+    """
+    >>> _format_value(3.0), _format_value(0.25)
+    ('3', '0.25')
+    """
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+_sink = MetricsSink()
+
+
+def get_sink() -> MetricsSink:
+    return _sink
+
+
+def set_sink(sink: MetricsSink):
+    """ Sends the metrics to sink (None to ignore them again) """
+    global _sink
+    _sink = sink if sink is not None else MetricsSink()
@@ -1,3 +1,18 @@
+# -*- coding: utf-8 -*-
+
+"""Nationalities of the countries of the Allociné feeds.
+
+get_nationality resolves a country name (accented or not, or an alias) with a precomputed index
+of the normalized names, and caches the result of each country name.
+"""
+
+from functools import lru_cache
+import logging
+from typing import Tuple
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
 # Based on https://gist.github.com/Mathieu-Castets/e36488c518d1fc4a03fa (thank you!)
 nationalities = {
     'AD': ('andorran', 'andorrane'),
@@ -444,3 +459,41 @@ countries = {
     'zambie': 'ZM',
     'zimbabwe': 'ZW',
 }
+
+# Other spellings of the Allociné feeds
+aliases = {
+    'etats-unis': 'US',
+    'usa': 'US',
+    'royaume-uni': 'GB',
+    'urss': 'SU',
+}
+
+
+def normalize_country_name(country_name: str) -> str:
+    """ Lowercase, without accents nor extra spaces, and with straight apostrophes
+    >>> normalize_country_name(' Côte d’Ivoire ')
+    "cote d'ivoire"
+    """
+    without_accents = ''.join(c for c in unicodedata.normalize('NFD', country_name)
+                              if unicodedata.category(c) != 'Mn')
+    return ' '.join(without_accents.replace('\u2019', "'").lower().split())
+
+
+# Normalized country name => country code (only the codes with a nationality)
+country_index = {normalize_country_name(country_name): country_code
+                 for country_name, country_code in {**countries, **aliases}.items()
+                 if country_code in nationalities}
+
+
+@lru_cache(maxsize=None)  # A few hundred distinct country names
+def get_nationality(country_name: str) -> Tuple[str, str]:
+    """ (masculine, feminine) nationality of a country.
+    An unknown country is logged once, and gives ('de <country_name>', 'de <country_name>')
+    >>> get_nationality('États-Unis'), get_nationality('U.S.A.')
+    (('américain', 'américaine'), ('américain', 'américaine'))
+    """
+    country_code = country_index.get(normalize_country_name(country_name))
+    if country_code is None:
+        logger.warning(f'Country {country_name!r} not found in nationalities')
+        return (f'de {country_name}', f'de {country_name}')
+    return nationalities[country_code]
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""Accessors to the fields of the raw Allociné feeds.
+
+FAST_ACCESSORS (used by default) are hand-written equivalents of the jmespath
+expressions of JMESPATH_ACCESSORS, which are kept as the reference implementation:
+tests/test_parsing.py checks that both give the same models.
+JMESPATH_ACCESSORS (and jmespath) are only loaded on first use.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+DEFAULT_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class JmespathAccessors:
+    """ Reference accessors: jmespath expressions (compiled once) """
+    def __init__(self):
+        import jmespath
+        self._total_results = jmespath.compile('feed.totalResults')
+        self._theater_showtimes = jmespath.compile('feed.theaterShowtimes')
+        self._raw_theater = jmespath.compile('place.theater')
+        self._movie_showtimes = jmespath.compile('movieShowtimes')
+        self._raw_movie = jmespath.compile('onShow.movie')
+        self._movie_code = jmespath.compile('onShow.movie.code')
+        self._language = jmespath.compile('version."$"')
+        self._screen_format = jmespath.compile('screenFormat."$"')
+        self._user_rating = jmespath.compile('statistics.userRating')
+        self._countries = jmespath.compile('nationality[]."$"')
+        self._genres = jmespath.compile('genre[]."$"')
+        self._directors = jmespath.compile('castingShort.directors')
+        self._actors = jmespath.compile('castingShort.actors')
+
+    def total_results(self, raw_showtimelist: dict) -> Optional[int]:
+        return self._total_results.search(raw_showtimelist)
+
+    def theater_showtimes(self, raw_showtimelist: dict) -> Optional[List[dict]]:
+        return self._theater_showtimes.search(raw_showtimelist)
+
+    def raw_theater(self, theater_showtime: dict) -> Optional[dict]:
+        return self._raw_theater.search(theater_showtime)
+
+    def movie_showtimes(self, theater_showtime: dict) -> Optional[List[dict]]:
+        return self._movie_showtimes.search(theater_showtime)
+
+    def raw_movie(self, movie_showtime: dict) -> Optional[dict]:
+        return self._raw_movie.search(movie_showtime)
+
+    def movie_code(self, movie_showtime: dict) -> Optional[int]:
+        return self._movie_code.search(movie_showtime)
+
+    def language(self, movie_showtime: dict) -> Optional[str]:
+        return self._language.search(movie_showtime)
+
+    def screen_format(self, movie_showtime: dict) -> Optional[str]:
+        return self._screen_format.search(movie_showtime)
+
+    def user_rating(self, raw_movie: dict):
+        return self._user_rating.search(raw_movie)
+
+    def countries(self, movie_info: dict) -> Optional[List[str]]:
+        return self._countries.search(movie_info)
+
+    def genres(self, movie_info: dict) -> Optional[List[str]]:
+        return self._genres.search(movie_info)
+
+    def directors(self, movie_info: dict) -> Optional[str]:
+        return self._directors.search(movie_info)
+
+    def actors(self, movie_info: dict) -> Optional[str]:
+        return self._actors.search(movie_info)
+
+    def showtime_datetime(self, day: str, hour: str) -> datetime:
+        return datetime.strptime('{}T{}:00'.format(day, hour), DEFAULT_DATE_FORMAT)
+
+
+class FastAccessors:
+    """ Hand-written accessors, with the same results as the jmespath expressions """
+
+    @staticmethod
+    def total_results(raw_showtimelist: dict) -> Optional[int]:
+        return _get_path(raw_showtimelist, 'feed', 'totalResults')
+
+    @staticmethod
+    def theater_showtimes(raw_showtimelist: dict) -> Optional[List[dict]]:
+        return _get_path(raw_showtimelist, 'feed', 'theaterShowtimes')
+
+    @staticmethod
+    def raw_theater(theater_showtime: dict) -> Optional[dict]:
+        return _get_path(theater_showtime, 'place', 'theater')
+
+    @staticmethod
+    def movie_showtimes(theater_showtime: dict) -> Optional[List[dict]]:
+        return _get_path(theater_showtime, 'movieShowtimes')
+
+    @staticmethod
+    def raw_movie(movie_showtime: dict) -> Optional[dict]:
+        return _get_path(movie_showtime, 'onShow', 'movie')
+
+    @staticmethod
+    def movie_code(movie_showtime: dict) -> Optional[int]:
+        return _get_path(movie_showtime, 'onShow', 'movie', 'code')
+
+    @staticmethod
+    def language(movie_showtime: dict) -> Optional[str]:
+        return _get_path(movie_showtime, 'version', '$')
+
+    @staticmethod
+    def screen_format(movie_showtime: dict) -> Optional[str]:
+        return _get_path(movie_showtime, 'screenFormat', '$')
+
+    @staticmethod
+    def user_rating(raw_movie: dict):
+        return _get_path(raw_movie, 'statistics', 'userRating')
+
+    @staticmethod
+    def countries(movie_info: dict) -> Optional[List[str]]:
+        return _flatten_values(_get_path(movie_info, 'nationality'))
+
+    @staticmethod
+    def genres(movie_info: dict) -> Optional[List[str]]:
+        return _flatten_values(_get_path(movie_info, 'genre'))
+
+    @staticmethod
+    def directors(movie_info: dict) -> Optional[str]:
+        return _get_path(movie_info, 'castingShort', 'directors')
+
+    @staticmethod
+    def actors(movie_info: dict) -> Optional[str]:
+        return _get_path(movie_info, 'castingShort', 'actors')
+
+    @staticmethod
+    @lru_cache(maxsize=4096)  # The same days and hours come back for every movie
+    def showtime_datetime(day: str, hour: str) -> datetime:
+        """
+        >>> FastAccessors.showtime_datetime('2020-03-04', '20:30')
+        datetime.datetime(2020, 3, 4, 20, 30)
+        """
+        year, month, day_of_month = day.split('-')
+        hours, minutes = hour.split(':')
+        return datetime(int(year), int(month), int(day_of_month), int(hours), int(minutes))
+
+
+def _get_path(node, *keys):
+    """ Equivalent of the jmespath expression 'key1.key2...'
+    >>> _get_path({'a': {'b': 1}}, 'a', 'b')
+    1
+    >>> _get_path({'a': [1]}, 'a', 'b') is None
+    True
+    """
+    for key in keys:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def _flatten_values(nodes) -> Optional[List]:
+    """ Equivalent of the jmespath expression 'nodes[]."$"'
+    >>> _flatten_values([{'$': 'France'}, [{'$': 'Italie'}], {'code': 1}])
+    ['France', 'Italie']
+    """
+    if not isinstance(nodes, list):
+        return None
+    values = []
+    for node in nodes:
+        for sub_node in (node if isinstance(node, list) else (node,)):
+            if isinstance(sub_node, dict):
+                value = sub_node.get('$')
+                if value is not None:
+                    values.append(value)
+    return values
+
+
+FAST_ACCESSORS = FastAccessors()
+
+
+def __getattr__(name):
+    """ JMESPATH_ACCESSORS is created on first use """
+    if name == 'JMESPATH_ACCESSORS':
+        accessors = globals()[name] = JmespathAccessors()
+        return accessors
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Client-side throttling of the requests to the Allociné APIs (used by Client).
+
+All the clients of a host share one Throttle (see get_shared_throttle): a token bucket limits the request rate,
+and a limit on the requests in flight limits the concurrency. Both adapt (AIMD):
+they increase additively after each success, and are cut multiplicatively
+when the API is overloaded (503 answer, timeout, or a latency spike).
+The latencies are compared per endpoint: a page of theaters is slower than a movie, not a spike.
+"""
+
+import threading
+import time
+from typing import Dict
+
+
+class Throttle:
+    """ - rate: requests per second (min_rate <= rate <= max_rate), with bursts of up to burst requests
+    - concurrency: requests in flight (min_concurrency <= concurrency <= max_concurrency)
+    - decrease_factor: both are multiplied by it on overload, at most once per cooldown seconds
+      (the requests already in flight are not considered as new overloads)
+    - latency_spike_factor: a response slower than this factor times the average latency of its endpoint
+      is an overload
+    """
+
+    def __init__(self, rate: float = 50, burst: int = 10, min_rate: float = 1, max_rate: float = 200,
+                 concurrency: float = 32, min_concurrency: int = 1, max_concurrency: int = 64,
+                 decrease_factor: float = 0.5, latency_spike_factor: float = 4, cooldown: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.decreases = 0
+        self.average_latencies = {}  # endpoint => exponential moving average, in seconds
+        self._latency_samples = {}  # endpoint => number of responses
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._decreased_at = None
+        self._condition = threading.Condition()
+
+    @property
+    def limits(self) -> dict:
+        """ Current limits and state """
+        with self._condition:
+            return {
+                'rate': self.rate,
+                'concurrency': int(self.concurrency),
+                'in_flight': self.in_flight,
+                'average_latencies': dict(self.average_latencies),
+                'decreases': self.decreases,
+            }
+
+    def acquire(self) -> float:
+        """ Waits for a token and a free slot. Returns the start time, to be given to release """
+        with self._condition:
+            while True:
+                self._refill()
+                if self.in_flight >= int(self.concurrency):
+                    self._condition.wait()  # Until a release
+                elif self._tokens < 1:
+                    self._condition.wait(timeout=(1 - self._tokens) / self.rate)
+                else:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    return time.monotonic()
+
+    def release(self, started_at: float, overloaded: bool = False, endpoint: str = None):
+        """ Ends a request started by acquire: overloaded if the API answered 503 or timed out.
+        endpoint: path of the request, whose latencies are compared to detect the spikes
+        """
+        latency = time.monotonic() - started_at
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded or self._is_latency_spike(endpoint, latency):
+                self._decrease(started_at)
+            else:
+                self._increase()
+            self._record_latency(endpoint, latency)
+            self._condition.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _increase(self):
+        # About +1 per round of requests, as TCP congestion avoidance
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+        self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+    def _decrease(self, started_at: float):
+        if self._decreased_at is not None and (
+                started_at < self._decreased_at or time.monotonic() - self._decreased_at < self.cooldown):
+            return  # Same overload
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease_factor)
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = min(self._tokens, 1)
+        self._decreased_at = time.monotonic()
+        self.decreases += 1
+
+    def _is_latency_spike(self, endpoint: str, latency: float) -> bool:
+        return (self._latency_samples.get(endpoint, 0) >= 10
+                and latency > self.latency_spike_factor * self.average_latencies[endpoint])
+
+    def _record_latency(self, endpoint: str, latency: float):
+        average_latency = self.average_latencies.get(endpoint)
+        if average_latency is None:
+            self.average_latencies[endpoint] = latency
+        else:
+            self.average_latencies[endpoint] = average_latency + 0.1 * (latency - average_latency)
+        self._latency_samples[endpoint] = self._latency_samples.get(endpoint, 0) + 1
+
+
+_SHARED_THROTTLES: Dict[str, Throttle] = {}
+_SHARED_THROTTLES_LOCK = threading.Lock()
+
+
+def get_shared_throttle(host: str) -> Throttle:
+    """ The Throttle of all the clients of host (with the default limits) """
+    with _SHARED_THROTTLES_LOCK:
+        throttle = _SHARED_THROTTLES.get(host)
+        if throttle is None:
+            throttle = _SHARED_THROTTLES[host] = Throttle()
+        return throttle
+
+
+def clear_shared_throttles():
+    """ The next clients start with new throttles """
+    with _SHARED_THROTTLES_LOCK:
+        _SHARED_THROTTLES.clear()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""Tracing of the stages of a call (requests, movie lookups, parsing, rendering), and profiling of a call.
+
+The spans are only created when an exporter is registered (otherwise span() returns a shared no-op span):
+
+    from allocine import tracing
+    tracing.add_exporter(tracing.JsonLinesExporter('spans.jsonl'))  # Or any callable taking a Span
+    allocine.get_theater('P2235')
+
+Each span knows its parent: the span of the request of a movie info is nested in the span of its lookup,
+itself nested in the span of the parsing (or of the prefetch) of the theater.
+
+To profile one call with cProfile:
+
+    theater, stats = tracing.profile_call(allocine.get_theater, 'P2235')
+    stats.sort_stats('cumulative').print_stats(20)
+"""
+
+import contextvars
+import itertools
+import json
+import threading
+import time
+from typing import Callable, List, Optional
+
+_current_span = contextvars.ContextVar('allocine_current_span', default=None)
+_span_ids = itertools.count(1)
+_exporters: List[Callable[['Span'], None]] = []
+
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'trace_id', 'attributes', 'start', 'duration', 'error',
+                 'thread', '_started_at', '_token')
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: dict):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self.thread = threading.current_thread().name
+        self._started_at = time.perf_counter()
+        self._token = None
+
+    def set_attribute(self, name: str, value):
+        self.attributes[name] = value
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self._started_at
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _current_span.reset(self._token)
+        for exporter in list(_exporters):
+            exporter(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'error': self.error,
+            'thread': self.thread,
+        }
+
+
+class _NoSpan:
+    """ Returned by span() when tracing is disabled """
+
+    def set_attribute(self, name: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **attributes):
+    """ Context manager timing a stage, nested in the current span """
+    if not _exporters:
+        return _NO_SPAN
+    return Span(name, _current_span.get(), attributes)
+
+
+def is_enabled() -> bool:
+    return bool(_exporters)
+
+
+def propagate(function: Callable) -> Callable:
+    """ function, run in the current span when called from another thread (e.g. by a ThreadPoolExecutor) """
+    if not _exporters:
+        return function
+    context = contextvars.copy_context()
+
+    def run_in_context(*args, **kwargs):
+        return context.copy().run(function, *args, **kwargs)  # A context cannot be entered by two threads
+    return run_in_context
+
+
+def add_exporter(exporter: Callable[[Span], None]):
+    """ exporter is called with each span when it ends """
+    _exporters.append(exporter)
+
+
+def remove_exporter(exporter: Callable[[Span], None]):
+    _exporters.remove(exporter)
+
+
+class JsonLinesExporter:
+    """ Appends the spans to a file, one JSON object per line """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as spans_file:
+            spans_file.write(line + '\n')
+
+
+class SpanRecorder:
+    """ Keeps the spans in memory """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def get_spans(self, name: str) -> List[Span]:
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+
+def profile_call(function: Callable, *args, dump_path=None, **kwargs):
+    """ Runs function(*args, **kwargs) with cProfile.
+    Returns its result and the pstats.Stats (also dumped to dump_path, for pstats or snakeviz).
+    """
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(function, *args, **kwargs)
+    finally:
+        if dump_path is not None:
+            profiler.dump_stats(dump_path)
+    return result, pstats.Stats(profiler)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Offline benchmark suite, on synthetic feeds (see benchmarks/feeds.py).
+
+Each benchmark reports its wall time (min / median / max of --repeat runs)
+and its peak memory (one more run traced by tracemalloc, so that tracing does not slow the timed runs).
+The results are saved as JSON, and can be compared with a previous run.
+
+Usage (from the root of the repository):
+    python -m benchmarks.bench [--theaters 20 --movies 20 --days 7 --showtimes-per-day 4]
+                               [--only parse_showtimes] [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from allocine import (
+    Allocine,
+    ShowtimeList,
+    _get_theater_showtimes,
+    _parse_showtimes,
+    _parse_theaters,
+    build_weekly_schedule_str,
+    weekly_schedule_cache_clear,
+)
+from allocine.cache import MemoryMovieCache
+from allocine.parsing import FAST_ACCESSORS
+from benchmarks.feeds import FIRST_DAY, FeedGenerator, SyntheticClient
+import seances
+
+RESULTS_PATH = Path(__file__).parent / 'results'
+GEOCODE = 115755  # Ignored by the synthetic client
+
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    """ Registers a benchmark: function(context) returns the callable to time """
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+class Context:
+    """ Synthetic feeds, and the theaters parsed from them, shared by the benchmarks """
+
+    def __init__(self, generator: FeedGenerator):
+        self.generator = generator
+        self.feed = generator.showtimelist(count=generator.theater_count)
+        self.raw_theater_showtimes = _get_theater_showtimes(self.feed)
+        self.movie_infos = {movie_id: generator.movie(movie_id)['movie'] for movie_id in generator.movie_ids}
+        self.theaters = _parse_theaters(self.raw_theater_showtimes, get_movie_info=self.movie_infos.__getitem__)
+        self.dates = [FIRST_DAY + timedelta(days=day) for day in range(generator.days)]
+
+
+@benchmark
+def parse_showtimes(context: Context):
+    raw_showtimes = [FAST_ACCESSORS.movie_showtimes(t) for t in context.raw_theater_showtimes]
+
+    def run():
+        movies = {}
+        for showtimes in raw_showtimes:
+            _parse_showtimes(showtimes, get_movie_info=context.movie_infos.__getitem__, movies=movies)
+    return run
+
+
+@benchmark
+def search_theaters(context: Context):
+    def run():
+        # A new movie cache each time, so that the movie info are requested again
+        allocine = Allocine(client=SyntheticClient(context.generator), movie_cache=MemoryMovieCache())
+        allocine.search_theaters(geocode=GEOCODE)
+    return run
+
+
+@benchmark
+def theater_queries(context: Context):
+    def run():
+        weekly_schedule_cache_clear()
+        for theater in context.theaters:
+            theater.showtimes = ShowtimeList(theater.showtimes)  # Forces the rebuild of the indexes
+            for date in context.dates:
+                theater.get_showtimes_of_a_day(date=date)
+                for movie_version in theater.get_movies_available_for_a_day(date=date):
+                    theater.get_showtimes_of_a_movie(movie_version=movie_version, date=date)
+            theater.get_showtimes_per_movie()
+            theater.get_program_per_movie()
+    return run
+
+
+@benchmark
+def weekly_schedule_str_cold(context: Context):
+    schedule_lists = [showtimes for theater in context.theaters
+                      for showtimes in theater.get_showtimes_per_movie_version().values()]
+
+    def run():
+        weekly_schedule_cache_clear()
+        for schedule_list in schedule_lists:
+            build_weekly_schedule_str(schedule_list)
+    return run
+
+
+@benchmark
+def weekly_schedule_str_warm(context: Context):
+    schedule_lists = [showtimes for theater in context.theaters
+                      for showtimes in theater.get_showtimes_per_movie_version().values()]
+    for schedule_list in schedule_lists:
+        build_weekly_schedule_str(schedule_list)
+
+    def run():
+        for schedule_list in schedule_lists:
+            build_weekly_schedule_str(schedule_list)
+    return run
+
+
+@benchmark
+def movie_nationalities(context: Context):
+    movies = {showtime.movie.movie for theater in context.theaters for showtime in theater.showtimes}
+
+    def run():
+        for movie in movies:
+            movie.nationalities
+    return run
+
+
+@benchmark
+def showtime_table(context: Context):
+    days = [date.strftime('%d/%m/%Y') for date in context.dates]
+
+    def run():
+        for theater in context.theaters:
+            for day in days:
+                seances.get_showtime_table(theater=theater, entrelignes=False, jour=day)
+    return run
+
+
+@benchmark
+def week_showtime_tables(context: Context):
+    # Compared to showtime_table, only the grouping of the showtimes is saved: PrettyTable renders each day anyway,
+    # and takes most of the time of both
+    days = [date.strftime('%d/%m/%Y') for date in context.dates]
+
+    def run():
+        for theater in context.theaters:
+            seances.get_showtime_tables(theater=theater, entrelignes=False, jours=days)
+    return run
+
+
+def measure(run, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_time_s': {
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'max': max(timings),
+        },
+        'peak_memory_bytes': peak_memory,
+        'repeat': repeat,
+    }
+
+
+def run_benchmarks(generator: FeedGenerator, repeat: int = 5, only=None) -> dict:
+    context = Context(generator)
+    results = {}
+    for name, function in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results[name] = measure(function(context), repeat=repeat)
+    return results
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict, previous_results: dict = None):
+    print('{:<26} {:>10} {:>10} {:>12}{}'.format(
+        'benchmark', 'min (ms)', 'med (ms)', 'peak (KiB)', '  vs previous' if previous_results else ''))
+    for name, result in results.items():
+        line = '{:<26} {:>10.2f} {:>10.2f} {:>12.1f}'.format(
+            name,
+            result['wall_time_s']['min'] * 1000,
+            result['wall_time_s']['median'] * 1000,
+            result['peak_memory_bytes'] / 1024,
+        )
+        previous = (previous_results or {}).get(name)
+        if previous:
+            line += '  {:>6.2f}x time {:>6.2f}x memory'.format(
+                result['wall_time_s']['min'] / previous['wall_time_s']['min'],
+                result['peak_memory_bytes'] / max(previous['peak_memory_bytes'], 1),
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--theaters', type=int, default=20)
+    parser.add_argument('--movies', type=int, default=20, help='movies per theater')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--showtimes-per-day', type=int, default=4, help='per movie version')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='benchmarks to run')
+    parser.add_argument('--output', type=Path, help=f'JSON file of the results (default: in {RESULTS_PATH})')
+    parser.add_argument('--compare', type=Path, help='JSON file of previous results')
+    args = parser.parse_args()
+
+    parameters = {
+        'theaters': args.theaters,
+        'movies': args.movies,
+        'days': args.days,
+        'showtimes_per_day': args.showtimes_per_day,
+        'seed': args.seed,
+    }
+    results = run_benchmarks(FeedGenerator(**parameters), repeat=args.repeat, only=args.only)
+
+    previous_results = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous_file:
+            previous = json.load(previous_file)
+        if previous['parameters'] != parameters:
+            print(f'Warning: {args.compare} was run with other parameters: {previous["parameters"]}')
+        previous_results = previous['results']
+    print_results(results, previous_results)
+
+    output = args.output or RESULTS_PATH / '{}.json'.format(datetime.now().strftime('%Y%m%d-%H%M%S'))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as output_file:
+        json.dump({
+            'parameters': parameters,
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'git_commit': get_git_commit(),
+                'date': datetime.now().isoformat(timespec='seconds'),
+            },
+            'results': results,
+        }, output_file, indent=2)
+    print(f'Results saved in {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the feed parsing: fast accessors vs jmespath accessors.
+
+Usage (from the root of the repository): python -m benchmarks.bench_parsing [--theaters 200]
+"""
+
+import argparse
+import copy
+import json
+from pathlib import Path
+import timeit
+
+from allocine import _get_theater_showtimes, _parse_theaters
+from allocine.parsing import FAST_ACCESSORS, JMESPATH_ACCESSORS
+
+DATA_PATH = Path(__file__).parent.parent / 'tests' / 'data'
+
+
+def load_big_feed(theater_count):
+    """ The recorded feed, with its theaters repeated theater_count times """
+    with open(DATA_PATH / 'showtimelist_geocode.json', encoding='utf-8') as feed_file:
+        feed = json.load(feed_file)
+    with open(DATA_PATH / 'movies.json', encoding='utf-8') as movies_file:
+        movies = {int(code): movie['movie'] for code, movie in json.load(movies_file).items()}
+
+    recorded_theaters = feed['feed']['theaterShowtimes']
+    feed['feed']['theaterShowtimes'] = [
+        copy.deepcopy(recorded_theaters[i % len(recorded_theaters)]) for i in range(theater_count)
+    ]
+    return feed, movies
+
+
+def parse(feed, movies, accessors):
+    raw_theater_showtimes = _get_theater_showtimes(feed, accessors=accessors)
+    return _parse_theaters(raw_theater_showtimes, get_movie_info=movies.__getitem__, accessors=accessors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--theaters', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    feed, movies = load_big_feed(args.theaters)
+    results = {}
+    for name, accessors in (('jmespath', JMESPATH_ACCESSORS), ('fast', FAST_ACCESSORS)):
+        timings = timeit.repeat(lambda: parse(feed, movies, accessors), number=1, repeat=args.repeat)
+        results[name] = min(timings)
+        print(f'{name:>8}: {results[name] * 1000:8.1f} ms')
+    print(f' speedup: {results["jmespath"] / results["fast"]:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""Deterministic generator of synthetic Allociné feeds (showtimelist and movie payloads),
+and a client serving them without any network access.
+"""
+
+from datetime import date, timedelta
+import math
+import random
+from urllib.parse import parse_qs, urlparse
+
+from allocine import BaseClient
+
+FIRST_DAY = date(2020, 3, 4)  # A wednesday, first day of a movie week
+HOURS = ['10:00', '10:45', '11:15', '13:30', '14:00', '15:50', '16:20', '17:15', '18:00', '19:30',
+         '20:00', '20:45', '21:15', '22:00', '22:30', '00:15']
+LANGUAGES = ['Français', 'Anglais', 'Japonais']
+SCREEN_FORMATS = ['Numérique', 'Numérique', 'Numérique', 'Numérique 3D', 'IMAX']
+COUNTRIES = ['France', 'U.S.A.', 'Belgique', 'Royaume-Uni', 'Japon', 'Corée du Sud', 'Italie', 'Espagne']
+GENRES = ['Drame', 'Comédie', 'Action', 'Animation', 'Thriller', 'Aventure', 'Documentaire']
+
+
+class FeedGenerator:
+    """ Generates the same payloads for the same parameters:
+    - theaters: number of theaters of the geocode
+    - movies: number of movies shown in each theater
+    - days: number of days of showtimes
+    - showtimes_per_day: number of showtimes of each movie version per day
+    """
+
+    def __init__(self, theaters=10, movies=20, days=7, showtimes_per_day=4, seed=0):
+        self.theater_count = theaters
+        self.movie_count = movies
+        self.days = days
+        self.showtimes_per_day = showtimes_per_day
+        self.seed = seed
+        self.theater_ids = ['B{:04d}'.format(i) for i in range(1, theaters + 1)]
+        self.movie_ids = [100000 + i for i in range(movies * 2)]  # Each theater shows half of them
+        self._theater_showtimes = {}
+
+    def movie(self, movie_id: int) -> dict:
+        """ Payload of the /movie endpoint """
+        rng = random.Random(f'{self.seed}-movie-{movie_id}')
+        return {'movie': {
+            'code': movie_id,
+            'originalTitle': f'Original title {movie_id}',
+            'productionYear': rng.randint(1950, 2020),
+            'synopsis': '<p>' + ' '.join(rng.choice(GENRES) for _ in range(60)) + '</p>',
+            'nationality': [{'code': 5000 + i, '$': country} for i, country in
+                            enumerate(rng.sample(COUNTRIES, rng.randint(1, 3)))],
+            'genre': [{'code': 13000 + i, '$': genre} for i, genre in enumerate(rng.sample(GENRES, 2))],
+            'castingShort': {
+                'directors': f'Director {movie_id}',
+                'actors': ', '.join(f'Actor {movie_id}-{i}' for i in range(4)),
+            },
+        }}
+
+    def theater_showtime(self, theater_id: str) -> dict:
+        """ Entry of a theater in feed.theaterShowtimes """
+        if theater_id not in self._theater_showtimes:
+            self._theater_showtimes[theater_id] = self._build_theater_showtime(theater_id)
+        return self._theater_showtimes[theater_id]
+
+    def _build_theater_showtime(self, theater_id: str) -> dict:
+        rng = random.Random(f'{self.seed}-theater-{theater_id}')
+        movie_showtimes = []
+        for movie_id in sorted(rng.sample(self.movie_ids, self.movie_count)):
+            versions = [('Français', 'Numérique')]
+            if movie_id % 3 == 0:
+                versions.append((rng.choice(LANGUAGES[1:]), rng.choice(SCREEN_FORMATS)))
+            for language, screen_format in versions:
+                days = []
+                for day in range(self.days):
+                    hours = sorted(rng.sample(HOURS, min(self.showtimes_per_day, len(HOURS))))
+                    days.append({
+                        'd': (FIRST_DAY + timedelta(days=day)).isoformat(),
+                        't': [{'code': 1, 'p': 1, '$': hour} for hour in hours],
+                    })
+                movie_showtimes.append({
+                    'onShow': {'movie': {
+                        'code': movie_id,
+                        'title': f'Film {movie_id}',
+                        'runtime': rng.randint(80, 180) * 60,
+                        'statistics': {'userRating': round(rng.uniform(1, 5), 2)},
+                    }},
+                    'version': {'original': 'false', '$': language},
+                    'screenFormat': {'$': screen_format},
+                    'scr': days,
+                })
+        return {
+            'place': {'theater': {
+                'code': theater_id,
+                'name': f'Cinéma {theater_id}',
+                'address': f'{rng.randint(1, 200)} rue du Cinéma',
+                'postalCode': '75001',
+                'city': 'Paris',
+                'distance': 0.0,
+            }},
+            'movieShowtimes': movie_showtimes,
+        }
+
+    def showtimelist(self, theater_ids=None, page: int = 1, count: int = 10) -> dict:
+        """ Payload of the /showtimelist endpoint, for a geocode (all the theaters) or some theater ids """
+        if theater_ids is None:
+            theater_ids = self.theater_ids
+        theater_ids = [theater_id for theater_id in theater_ids if theater_id in self.theater_ids]
+        start = (page - 1) * count
+        return {'feed': {
+            'page': page,
+            'count': count,
+            'totalResults': len(theater_ids),
+            'theaterShowtimes': [self.theater_showtime(theater_id)
+                                 for theater_id in theater_ids[start:start + count]],
+        }}
+
+    def theater(self, theater_id: str) -> dict:
+        """ Payload of the /theater endpoint """
+        if theater_id not in self.theater_ids:
+            return {'theater': None}
+        return {'theater': self.theater_showtime(theater_id)['place']['theater']}
+
+    def page_count(self, count: int = 10) -> int:
+        return math.ceil(self.theater_count / count)
+
+    def route(self, path: str, query: dict):
+        """ Returns the (status, payload) of a request on an endpoint """
+        if path.endswith('/showtimelist'):
+            theater_ids = query['theaters'].split(',') if 'theaters' in query else None
+            return 200, self.showtimelist(theater_ids, int(query.get('page', 1)), int(query.get('count', 10)))
+        if path.endswith('/movie'):
+            return 200, self.movie(int(query['code']))
+        if path.endswith('/theater'):
+            return 200, self.theater(query['code'])
+        return 404, {}
+
+
+class SyntheticClient(BaseClient):
+    """ Client answering the requests with a FeedGenerator, without any network access """
+
+    def __init__(self, generator: FeedGenerator, base_url='http://synthetic'):
+        self.generator = generator
+        self.base_url = base_url
+        self.requests = 0
+
+    def _get(self, url: str, expected_status: int = 200, *args, **kwargs):
+        self.requests += 1
+        parsed_url = urlparse(url)
+        query = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+        status, payload = self.generator.route(parsed_url.path, query)
+        if status != expected_status:
+            raise ValueError('{!r} : expected status {}, received {}'.format(url, expected_status, status))
+        return payload
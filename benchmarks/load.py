@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Load test of Allocine against the local stub server (see benchmarks/stub_server.py),
+with a realistic upstream latency and rate of 503 errors.
+
+For each scenario (the sync path and the concurrent ones), reports the throughput in theaters per second,
+the latency percentiles of the operations, and the 503 answers retried by the client.
+The client, its throttle and the movie info cache live as long as the scenario: the first round is cold,
+the next ones are warm, as for a deployment refreshing the same theaters.
+
+Usage (from the root of the repository):
+    python -m benchmarks.load [--latency 0.05 --jitter 0.02 --error-rate 0.02] [--workers 8] [--rounds 2]
+                              [--base-url http://127.0.0.1:8000] [--output results.json]
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+import json
+from pathlib import Path
+import time
+
+from allocine import Allocine, Client
+from allocine.cache import MemoryMovieCache
+from allocine.throttle import clear_shared_throttles
+from benchmarks.bench import RESULTS_PATH, get_git_commit
+from benchmarks.feeds import FeedGenerator
+from benchmarks.stub_server import RecordedFeeds, StubServer
+
+GEOCODE = 115755  # Ignored by the stub server
+
+SCENARIOS = {}
+
+
+def scenario(function):
+    """ Registers a scenario: function(base_url, theater_ids, workers, rounds)
+    returns the operations (callables returning the number of theaters refreshed) and their concurrency """
+    SCENARIOS[function.__name__] = function
+    return function
+
+
+@scenario
+def sync_get_theater(base_url, theater_ids, workers, rounds):
+    allocine = Allocine(base_url=base_url, movie_cache=MemoryMovieCache())
+    return [partial(_get_theater, allocine, theater_id) for _ in range(rounds) for theater_id in theater_ids], 1
+
+
+@scenario
+def threads_get_theater(base_url, theater_ids, workers, rounds):
+    allocine = Allocine(base_url=base_url, movie_cache=MemoryMovieCache())
+    return [partial(_get_theater, allocine, theater_id)
+            for _ in range(rounds) for theater_id in theater_ids], workers
+
+
+@scenario
+def get_theaters(base_url, theater_ids, workers, rounds):
+    allocine = Allocine(base_url=base_url, max_workers=workers, movie_cache=MemoryMovieCache())
+    return [lambda: len(allocine.get_theaters(theater_ids)) for _ in range(rounds)], 1
+
+
+@scenario
+def sync_search_theaters(base_url, theater_ids, workers, rounds):
+    allocine = Allocine(base_url=base_url, movie_cache=MemoryMovieCache())
+    return [lambda: len(allocine.search_theaters(geocode=GEOCODE)) for _ in range(rounds)], 1
+
+
+@scenario
+def search_theaters(base_url, theater_ids, workers, rounds):
+    allocine = Allocine(base_url=base_url, max_workers=workers, movie_cache=MemoryMovieCache())
+    return [lambda: len(allocine.search_theaters(geocode=GEOCODE)) for _ in range(rounds)], 1
+
+
+def _get_theater(allocine, theater_id):
+    allocine.get_theater(theater_id)
+    return 1
+
+
+def run_operations(operations, concurrency: int) -> dict:
+    latencies = []
+    theaters = 0
+    errors = 0
+
+    def run(operation):
+        start = time.perf_counter()
+        try:
+            return operation(), time.perf_counter() - start
+        except Exception:
+            return None, time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(run, operations))
+    else:
+        outcomes = [run(operation) for operation in operations]
+    elapsed = time.perf_counter() - start
+
+    for count, latency in outcomes:
+        latencies.append(latency)
+        if count is None:
+            errors += 1
+        else:
+            theaters += count
+    return summarize(latencies, theaters, errors, elapsed)
+
+
+def run_async_get_theater(base_url, theater_ids, workers, rounds) -> dict:
+    from allocine.aio import AsyncAllocine, AsyncClient
+
+    async def run():
+        latencies = []
+        errors = 0
+        async with AsyncAllocine(client=AsyncClient(base_url=base_url, limit=workers),
+                                 movie_cache=MemoryMovieCache()) as allocine:
+
+            async def get_theater(theater_id):
+                nonlocal errors
+                start = time.perf_counter()
+                try:
+                    await allocine.get_theater(theater_id)
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                await asyncio.gather(*[get_theater(theater_id) for theater_id in theater_ids])
+            elapsed = time.perf_counter() - start
+        return summarize(latencies, len(latencies) - errors, errors, elapsed)
+
+    return asyncio.run(run())
+
+
+def percentile(sorted_values, percent):
+    """ Nearest-rank percentile
+    >>> percentile([1, 2, 3, 4], 50)
+    2
+    >>> percentile([1, 2, 3, 4], 99)
+    4
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))  # Ceiling
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies, theaters, errors, elapsed) -> dict:
+    latencies = sorted(latencies)
+    return {
+        'operations': len(latencies),
+        'errors': errors,
+        'theaters': theaters,
+        'elapsed_s': elapsed,
+        'theaters_per_s': theaters / elapsed if elapsed else None,
+        'latency_s': {f'p{p}': percentile(latencies, p) for p in (50, 90, 95, 99, 100)},
+    }
+
+
+def run_scenarios(base_url, theater_ids, workers=8, rounds=2, only=None, server: StubServer = None) -> dict:
+    """ server (if the stub server runs in this process) gives the number of requests and of 503 answers """
+    names = list(SCENARIOS) + ['async_get_theater']
+    results = {}
+    for name in names:
+        if only and name not in only:
+            continue
+        Client.clear_instances()  # A new client and throttle, not slowed down by the previous scenario
+        clear_shared_throttles()
+        stats_before = server.stats() if server else None
+        if name == 'async_get_theater':
+            try:
+                result = run_async_get_theater(base_url, theater_ids, workers, rounds)
+            except ImportError:  # aiohttp is not installed
+                continue
+        else:
+            operations, concurrency = SCENARIOS[name](base_url, theater_ids, workers, rounds)
+            result = run_operations(operations, concurrency)
+        if server:
+            stats = server.stats()
+            result['requests'] = sum(stats['requests'].values()) - sum(stats_before['requests'].values())
+            result['retries_503'] = stats['errors_503'] - stats_before['errors_503']
+        results[name] = result
+    return results
+
+
+def print_results(results: dict):
+    print('{:<22} {:>10} {:>9} {:>9} {:>9} {:>9} {:>9} {:>8} {:>7}'.format(
+        'scenario', 'theaters/s', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'max (ms)', 'requests', 'retries', 'errors'))
+    for name, result in results.items():
+        latency = result['latency_s']
+        print('{:<22} {:>10.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9} {:>8} {:>7}'.format(
+            name,
+            result['theaters_per_s'],
+            latency['p50'] * 1000,
+            latency['p90'] * 1000,
+            latency['p99'] * 1000,
+            latency['p100'] * 1000,
+            result.get('requests', '-'),
+            result.get('retries_503', '-'),
+            result['errors'],
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', help='an already running server (by default, a stub server is started)')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='seconds')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='probability of a 503 answer')
+    parser.add_argument('--recorded', action='store_true', help='serves the feeds of tests/data')
+    parser.add_argument('--theaters', type=int, default=20)
+    parser.add_argument('--movies', type=int, default=20, help='movies per theater')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--showtimes-per-day', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=8, help='concurrency of the concurrent scenarios')
+    parser.add_argument('--rounds', type=int, default=2, help='refreshes of all the theaters per scenario')
+    parser.add_argument('--only', nargs='+', choices=list(SCENARIOS) + ['async_get_theater'])
+    parser.add_argument('--output', type=Path, help=f'JSON file of the results (default: in {RESULTS_PATH})')
+    args = parser.parse_args()
+
+    if args.recorded:
+        feeds = RecordedFeeds()
+        theater_ids = list(feeds.theaters)
+    else:
+        feeds = FeedGenerator(theaters=args.theaters, movies=args.movies, days=args.days,
+                              showtimes_per_day=args.showtimes_per_day, seed=args.seed)
+        theater_ids = feeds.theater_ids
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ('only', 'output')}
+    if args.base_url:
+        results = run_scenarios(args.base_url, theater_ids, args.workers, args.rounds, args.only)
+    else:
+        with StubServer(feeds, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        seed=args.seed) as server:
+            results = run_scenarios(server.base_url, theater_ids, args.workers, args.rounds, args.only, server)
+    print_results(results)
+
+    output = args.output or RESULTS_PATH / 'load-{}.json'.format(datetime.now().strftime('%Y%m%d-%H%M%S'))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as output_file:
+        json.dump({
+            'parameters': parameters,
+            'git_commit': get_git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'results': results,
+        }, output_file, indent=2)
+    print(f'Results saved in {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Local stand-in for the Allociné API, serving /showtimelist, /movie and /theater
+from synthetic feeds (see benchmarks/feeds.py) or from the recorded feeds of tests/data,
+with a configurable latency, jitter and rate of 503 errors. The tests use it too (see tests/conftest.py).
+
+Usage (from the root of the repository):
+    python -m benchmarks.stub_server [--port 8000] [--latency 0.05 --jitter 0.02 --error-rate 0.05] [--recorded]
+then: Allocine(base_url='http://127.0.0.1:8000')
+"""
+
+import argparse
+from collections import Counter
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.feeds import FeedGenerator
+
+DATA_PATH = Path(__file__).parent.parent / 'tests' / 'data'
+
+
+class RecordedFeeds:
+    """ Serves the recorded feeds of tests/data, with the same interface as FeedGenerator.route """
+
+    def __init__(self, data_path=DATA_PATH):
+        with open(data_path / 'showtimelist_geocode.json', encoding='utf-8') as feed_file:
+            self.theater_showtimes = json.load(feed_file)['feed']['theaterShowtimes']
+        with open(data_path / 'movies.json', encoding='utf-8') as movies_file:
+            self.movies = {int(code): movie for code, movie in json.load(movies_file).items()}
+        self.theaters = {t['place']['theater']['code']: t for t in self.theater_showtimes}
+
+    def route(self, path: str, query: dict):
+        if path.endswith('/showtimelist'):
+            if 'theaters' in query:
+                theater_showtimes = [self.theaters[code] for code in query['theaters'].split(',')
+                                     if code in self.theaters]
+            else:
+                theater_showtimes = self.theater_showtimes
+            page, count = int(query.get('page', 1)), int(query.get('count', 10))
+            start = (page - 1) * count
+            return 200, {'feed': {
+                'page': page,
+                'count': count,
+                'totalResults': len(theater_showtimes),
+                'theaterShowtimes': theater_showtimes[start:start + count],
+            }}
+        if path.endswith('/movie'):
+            movie = self.movies.get(int(query['code']))
+            return (200, movie) if movie is not None else (404, {})
+        if path.endswith('/theater'):
+            theater_showtime = self.theaters.get(query['code'])
+            return 200, {'theater': theater_showtime['place']['theater'] if theater_showtime else None}
+        return 404, {}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, as the real API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        status, body = self.server.respond(url.path, query)
+
+        etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.server.record_not_modified()
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """ feeds: FeedGenerator, RecordedFeeds, or any object with their route method
+    - latency, jitter: each response is delayed by latency +/- jitter seconds
+    - error_rate: probability of answering 503 Service Unavailable
+    - next_503: number of 503 answers to send before serving normally (set it to test the retries)
+    Answers 304 Not Modified to a request with the ETag of the response.
+    """
+    daemon_threads = True
+
+    def __init__(self, feeds, host='127.0.0.1', port=0, latency: float = 0, jitter: float = 0,
+                 error_rate: float = 0, seed: int = 0):
+        super().__init__((host, port), StubHandler)
+        self.feeds = feeds
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.next_503 = 0
+        self.requests = []  # (path, query) of each request
+        self.errors_503 = 0  # Number of 503 answers sent
+        self.not_modified = 0  # Number of 304 answers sent
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return 'http://{}:{}'.format(*self.server_address)
+
+    def respond(self, path: str, query: dict):
+        """ Returns the status and the body of a request """
+        with self._lock:
+            self.requests.append((path, query))
+            delay = max(0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate or self.next_503 > 0
+            if failed:
+                self.next_503 = max(0, self.next_503 - 1)
+                self.errors_503 += 1
+        time.sleep(delay)
+        if failed:
+            return 503, b'{}'
+
+        status, payload = self.feeds.route(path, query)
+        return status, json.dumps(payload).encode('utf-8')
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def count(self, path: str) -> int:
+        """ Number of requests on path """
+        with self._lock:
+            return len([p for p, _ in self.requests if p == path])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'requests': dict(Counter(path for path, _ in self.requests)), 'errors_503': self.errors_503}
+
+    def start(self):
+        """ Serves in a background thread """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='probability of a 503 answer')
+    parser.add_argument('--recorded', action='store_true', help='serves the feeds of tests/data')
+    parser.add_argument('--theaters', type=int, default=20)
+    parser.add_argument('--movies', type=int, default=20, help='movies per theater')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--showtimes-per-day', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.recorded:
+        feeds = RecordedFeeds()
+    else:
+        feeds = FeedGenerator(theaters=args.theaters, movies=args.movies, days=args.days,
+                              showtimes_per_day=args.showtimes_per_day, seed=args.seed)
+    server = StubServer(feeds, host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, seed=args.seed)
+    print(f'Serving on {server.base_url} (Ctrl+C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.stats())
+
+
+if __name__ == '__main__':
+    main()
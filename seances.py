@@ -2,13 +2,25 @@
 # -*- coding: utf-8 -*-
 
 """CLI tool for allocine"""
+import time
+# For --profile. A module level dunder can come before the imports (PEP 8)
+__import_started_at__ = time.perf_counter()
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+import json
+import sys
 import click
-from allocine import Allocine
-from prettytable import PrettyTable, UNICODE, FRAME, ALL
+from allocine import Allocine, TheaterNotFound, tracing
+from allocine.cache import SQLiteMovieCache, DEFAULT_CACHE_PATH
 from datetime import date, timedelta, datetime
+IMPORT_DURATION = time.perf_counter() - __import_started_at__
 
 # Usage : seances.py --help
 
+MAX_WORKERS = 8  # Theaters (and movie info) requested at the same time
+FORMATS = ('table', 'json', 'ndjson', 'csv')
+SHOWTIME_FIELDS = ['theater_id', 'theater', 'date', 'movie_id', 'title', 'version', 'duration', 'rating', 'time']
+
 
 def extract_field_names(dict_list):
     """ Returns a sorted list of field names from a dictionary list
@@ -24,9 +36,19 @@ def extract_field_names(dict_list):
 
 @click.command()
 @click.argument(
-    'id_cinema',
+    'ids_cinema',
     type=str,
-    required=True
+    nargs=-1,
+)
+@click.option(
+    '--geocode', '-g',
+    type=int,
+    help='affiche tous les cinémas d’une ville, avec son code Allociné (ex: 115755 pour Paris)',
+)
+@click.option(
+    '--arrivee', '-a',
+    is_flag=True,
+    help='affiche les cinémas dans l’ordre où ils arrivent, plutôt que dans l’ordre des identifiants',
 )
 @click.option(
     '--jour', '-j',
@@ -44,16 +66,162 @@ def extract_field_names(dict_list):
     is_flag=True,
     help='ajoute une ligne entre chaque film pour améliorer la lisibilité',
 )
-def main(id_cinema, entrelignes, jour=None, semaine=None):
+@click.option(
+    '--format', '-f', 'format_sortie',
+    type=click.Choice(FORMATS),
+    default='table',
+    show_default=True,
+    help='json, ndjson ou csv : une ligne par séance, écrite au fil de l’eau, pour d’autres outils',
+)
+@click.option(
+    '--cache', '-c',
+    is_flag=True,
+    help=f'garde les infos des films entre deux appels (dans {DEFAULT_CACHE_PATH})',
+)
+@click.option(
+    '--profile', '-p',
+    is_flag=True,
+    help='affiche le temps passé dans chaque étape (réseau, parsing, rendu…)',
+)
+@click.option(
+    '--pstats',
+    type=click.Path(dir_okay=False, writable=True),
+    help='enregistre le profil cProfile dans ce fichier (à lire avec pstats ou snakeviz)',
+)
+def main(ids_cinema, entrelignes, jour=None, semaine=None, cache=False, profile=False, pstats=None,
+         geocode=None, arrivee=False, format_sortie='table'):
     """
-    Les séances de votre cinéma dans le terminal, avec
-    ID_CINEMA : identifiant du cinéma sur Allociné,
+    Les séances de vos cinémas dans le terminal, avec
+    IDS_CINEMA : un ou plusieurs identifiants de cinéma sur Allociné,
     ex: C0159 pour l’UGC Ciné Cité Les Halles. Se trouve dans l’url :
     http://allocine.fr/seance/salle_gen_csalle=<ID_CINEMA>.html
     """
-    today = date.today()
-    allocine = Allocine()
+    if not ids_cinema and geocode is None:
+        raise click.UsageError('indiquez au moins un ID_CINEMA, ou --geocode')
+    if ids_cinema and geocode is not None:
+        raise click.UsageError('indiquez des ID_CINEMA ou --geocode, pas les deux')
+
+    recorder = None
+    if profile:
+        recorder = tracing.SpanRecorder()
+        tracing.add_exporter(recorder)
+    started_at = time.perf_counter()
+    arguments = (ids_cinema, entrelignes, jour, semaine, cache, geocode, arrivee, format_sortie)
+    try:
+        if pstats:
+            not_found, _ = tracing.profile_call(print_showtimes, *arguments, dump_path=pstats)
+        else:
+            not_found = print_showtimes(*arguments)
+    finally:
+        if recorder is not None:
+            tracing.remove_exporter(recorder)
+    if recorder is not None:
+        report = get_profile_report(recorder.spans, IMPORT_DURATION, time.perf_counter() - started_at)
+        click.echo(report, err=format_sortie != 'table')  # Keeps the rows alone on stdout
+    if not_found:
+        sys.exit(1)
+
+
+def print_showtimes(ids_cinema, entrelignes, jour=None, semaine=False, cache=False, geocode=None, arrivee=False,
+                    format_sortie='table'):
+    """ Prints the showtimes of each theater as soon as it is ready (the theaters are requested concurrently,
+    and share their movie info). Returns the ids (or the geocode) not found """
+    jours = get_days(jour, semaine)
+    allocine = Allocine(movie_cache=SQLiteMovieCache() if cache else None, max_workers=MAX_WORKERS)
+    not_found = []
+
+    def iter_found_theaters():
+        if geocode is not None:
+            try:
+                yield from allocine.iter_theaters(geocode=geocode)
+            except TheaterNotFound:  # Any other error (e.g. on a next page) is not a missing geocode
+                click.echo(f'Aucun cinéma trouvé pour le geocode {geocode}', err=True)
+                not_found.append(geocode)
+            return
+        for theater_id, theater in iter_theaters(allocine, ids_cinema, in_order=not arrivee):
+            if theater is None:
+                click.echo(f'Cinéma introuvable : {theater_id}', err=True)
+                not_found.append(theater_id)
+            else:
+                yield theater
+
+    if format_sortie == 'table':
+        for theater in iter_found_theaters():
+            print(format_theater(theater, entrelignes, jours), end='', flush=True)
+    else:
+        write_showtimes(iter_found_theaters(), jours, format_sortie, sys.stdout)
+    return not_found
+
 
+def iter_theaters(allocine, theater_ids, in_order=True):
+    """ Requests the theaters concurrently, and yields (theater id, theater or None if not found)
+    as soon as they are ready: in the order of theater_ids, or in order of arrival """
+    theater_ids = list(dict.fromkeys(theater_ids))  # Removes duplicates
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(theater_ids))) as executor:
+        futures = {executor.submit(tracing.propagate(allocine.get_theater), theater_id): theater_id
+                   for theater_id in theater_ids}
+        for future in (futures if in_order else as_completed(futures)):
+            try:
+                yield futures[future], future.result()
+            except TheaterNotFound:
+                yield futures[future], None
+
+
+def format_theater(theater, entrelignes, jours):
+    """ Name of the theater, and its table for each day """
+    return '{}, le '.format(theater.name) + ''.join(
+        table + '\n\n' for table in get_showtime_tables(theater=theater, entrelignes=entrelignes, jours=jours))
+
+
+def write_showtimes(theaters, jours, format_sortie, stream):
+    """ Writes one row per showtime of the theaters on these days, theater by theater, without building tables:
+    a JSON array, one JSON object per line (ndjson), or CSV with a header """
+    json_separator = '\n'
+    if format_sortie == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=SHOWTIME_FIELDS, lineterminator='\n')
+        writer.writeheader()
+    elif format_sortie == 'json':
+        stream.write('[')
+    try:
+        for theater in theaters:
+            for row in iter_showtime_rows(theater, jours):
+                if format_sortie == 'csv':
+                    writer.writerow(row)
+                elif format_sortie == 'ndjson':
+                    stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+                else:
+                    stream.write(json_separator + json.dumps(row, ensure_ascii=False))
+                    json_separator = ',\n'
+            stream.flush()
+    finally:
+        if format_sortie == 'json':
+            stream.write('\n]\n')  # Still a valid array if a theater failed
+
+
+def iter_showtime_rows(theater, jours):
+    """ Yields a dict per showtime of the theater on these days (DD/MM/YYYY), day by day """
+    for jour in jours:
+        date_obj = datetime.strptime(jour, '%d/%m/%Y').date()
+        date_str = date_obj.isoformat()
+        for showtime in theater.get_showtimes_of_a_day(date=date_obj):
+            movie_version = showtime.movie
+            duration = movie_version.duration
+            yield {
+                'theater_id': theater.theater_id,
+                'theater': theater.name,
+                'date': date_str,
+                'movie_id': movie_version.movie_id,
+                'title': movie_version.title,
+                'version': movie_version.version,
+                'duration': int(duration.total_seconds()) // 60 if duration is not None else None,  # Minutes
+                'rating': movie_version.rating,
+                'time': showtime.hour_str,
+            }
+
+
+def get_days(jour=None, semaine=False):
+    """ Days of the showtimes to print, as DD/MM/YYYY """
+    today = date.today()
     jours = []
     if semaine is False:
         if jour is None:
@@ -68,49 +236,96 @@ def main(id_cinema, entrelignes, jour=None, semaine=None):
         for delta in range(0, 7):
             jour_obj = today + timedelta(days=delta)
             jours.append(jour_obj.strftime("%d/%m/%Y"))
+    return jours
 
-    theater = allocine.get_theater(theater_id=id_cinema)
 
-    print('{}, le '.format(theater.name), end='')
-    for jour in jours:
-        print(get_showtime_table(
-            theater=theater,
-            entrelignes=entrelignes,
-            jour=jour)
-        )
-        print()
+def get_profile_report(spans, import_duration, run_duration):
+    """ Time spent in each stage, from the spans recorded by allocine.tracing """
+    def total(name, **attributes):
+        return sum(span.duration for span in spans if span.name == name
+                   and all(span.attributes.get(key) == value for key, value in attributes.items()))
+
+    def children_total(name, parent_name):
+        parent_ids = {span.span_id for span in spans if span.name == parent_name}
+        return sum(span.duration for span in spans if span.name == name and span.parent_id in parent_ids)
+
+    stages = [('import des modules', import_duration, '')]
+    endpoints = sorted({span.attributes.get('endpoint') for span in spans if span.name == 'request'})
+    for endpoint in endpoints:
+        count = len([s for s in spans if s.name == 'request' and s.attributes.get('endpoint') == endpoint])
+        stages.append((f'réseau {endpoint}', total('request', endpoint=endpoint),
+                       '{} requête{}'.format(count, 's' if count > 1 else '')))
+    stages += [
+        ('décodage JSON', total('decode_json'), ''),
+        # Without the movie info fetched while parsing
+        ('parsing des modèles', total('parse_theaters') - children_total('fetch_movie_info', 'parse_theaters'), ''),
+        ('index et regroupements', total('render') - total('format_table'), ''),
+        ('rendu des tableaux (PrettyTable)', total('format_table'), ''),
+        ('total (hors import)', run_duration, ''),
+    ]
+
+    lines = ['Profil :']
+    for stage, duration, comment in stages:
+        lines.append('  {:<34} {:>9.1f} ms  {}'.format(stage, duration * 1000, comment).rstrip())
+    return '\n'.join(lines)
 
 
 def get_showtime_table(theater, entrelignes, jour):
-    showtime_table = []
+    return get_showtime_tables(theater=theater, entrelignes=entrelignes, jours=[jour])[0]
 
-    date_obj = datetime.strptime(jour, '%d/%m/%Y').date()
-    movies_available_today = theater.get_movies_available_for_a_day(date=date_obj)
 
-    for movie_version in movies_available_today:
+def get_showtime_tables(theater, entrelignes, jours):
+    """ The tables of several days (e.g. of the week), from one pass over the showtimes of the theater """
+    with tracing.span('render', theater_id=theater.theater_id, days=len(jours)):
+        dates = [datetime.strptime(jour, '%d/%m/%Y').date() for jour in jours]
+        rows_per_date, hours_per_date = _group_showtimes(theater.showtimes, dates)
+        return [_get_day_table(jour, rows_per_date[date_obj], hours_per_date[date_obj], entrelignes)
+                for jour, date_obj in zip(jours, dates)]
 
-        title = movie_version.title
-        if len(title) >= 31:  # On tronque les titres trop longs
-            title = title[:31] + '...'
 
-        # '*1_film' pour être sûr que cela soit la 1ère colonne
-        movie_row = {'*1_film': "{} ({}) - {}".format(
-            title,
-            movie_version.version,
-            movie_version.duration_str)}
+def _group_showtimes(showtimes, dates):
+    """ Groups the showtimes of the given dates per (date, movie version, hour):
+    returns the rows of each date (one per movie version, in order of appearance)
+    and the hours of each date """
+    rows_per_date = {date_obj: {} for date_obj in dates}
+    hours_per_date = {date_obj: set() for date_obj in dates}
+    movie_cells = {}  # The title and rating cells of a movie version are the same every day
+    for showtime in showtimes:
+        date_obj = showtime.date
+        rows = rows_per_date.get(date_obj)
+        if rows is None:
+            continue  # Another day
+        movie_version = showtime.movie
+        movie_row = rows.get(movie_version)
+        if movie_row is None:
+            cells = movie_cells.get(movie_version)
+            if cells is None:
+                cells = movie_cells[movie_version] = _get_movie_cells(movie_version)
+            movie_row = rows[movie_version] = dict(cells)
+        hour_str = showtime.hour_str
+        hour = hour_str.split(':')[0]  # 11:15 => 11
+        movie_row[hour] = hour_str
+        hours_per_date[date_obj].add(hour)
+    return rows_per_date, hours_per_date
 
-        movie_row['*2_note'] = "{}*".format(movie_version.rating_str)
 
-        showtimes = theater.get_showtimes_of_a_movie(
-            movie_version=movie_version, date=date_obj)
+def _get_movie_cells(movie_version):
+    title = movie_version.title
+    if len(title) >= 31:  # On tronque les titres trop longs
+        title = title[:31] + '...'
 
-        for showtime in showtimes:
-            hour = showtime.hour_str.split(':')[0]  # 11:15 => 11
-            movie_row[hour] = showtime.hour_str
+    # '*1_film' pour être sûr que cela soit la 1ère colonne
+    return {
+        '*1_film': "{} ({}) - {}".format(
+            title,
+            movie_version.version,
+            movie_version.duration_str),
+        '*2_note': "{}*".format(movie_version.rating_str),
+    }
 
-        showtime_table.append(movie_row)
 
-    seances = showtime_table
+def _get_day_table(jour, rows, hours, entrelignes):
+    seances = list(rows.values())
 
     retour = "{}\n".format(jour)
 
@@ -118,28 +333,33 @@ def get_showtime_table(theater, entrelignes, jour):
         retour += "Aucune séance"
 
     else:
-        table = PrettyTable()
-        table.set_style(UNICODE)
-        table.header = False
+        with tracing.span('format_table'):
+            retour += _format_table(seances, entrelignes, field_names=sorted(hours | {'*1_film', '*2_note'}))
+
+    return retour
 
-        if entrelignes is True:
-            table.hrules = ALL
-        else:
-            table.hrules = FRAME
 
-        table.field_names = extract_field_names(seances)
+def _format_table(seances, entrelignes, field_names=None):
+    from prettytable import PrettyTable, UNICODE, FRAME, ALL  # Not needed by --help, nor by the other formats
+    table = PrettyTable()
+    table.set_style(UNICODE)
+    table.header = False
 
-        for seances_film in seances:
-            row = []
-            for field_name in table.field_names:
-                row.append(seances_film.get(field_name, ""))
-            table.add_row(row)
+    if entrelignes is True:
+        table.hrules = ALL
+    else:
+        table.hrules = FRAME
 
-        table.align["*1_film"] = "l"
-        table.sortby = "*1_film"
-        retour += str(table)
+    table.field_names = field_names or extract_field_names(seances)
 
-    return retour
+    # Sorted here rather than with table.sortby, which decorates and sorts the rows each time the table is printed
+    # (on the film, then on the whole row: the same order, as the rows start with the film)
+    rows = sorted([seances_film.get(field_name, "") for field_name in table.field_names] for seances_film in seances)
+    for row in rows:
+        table.add_row(row)
+
+    table.align["*1_film"] = "l"
+    return str(table)
 
 
 if __name__ == "__main__":
@@ -36,6 +36,9 @@ setup(
     keywords=_KEYWORDS,
     setup_requires=requirements,
     install_requires=requirements,
+    extras_require={
+        'async': ['aiohttp>=3.6'],
+    },
     classifiers=[
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python :: 3',
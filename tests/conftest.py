@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Offline fixtures: a tiny stand-in for the Allociné API, served on localhost by benchmarks/stub_server.py."""
+
+import pytest
+
+from allocine import Client
+from allocine.cache import clear_shared_movie_caches
+from allocine.throttle import clear_shared_throttles
+from benchmarks.stub_server import StubServer
+
+MOVIES = {
+    1001: {
+        'code': 1001,
+        'title': 'Le Grand Film',
+        'originalTitle': 'The Big Movie',
+        'productionYear': 2019,
+        'runtime': 5400,
+        'synopsis': '<span>Un grand\xa0film.</span>',
+        'nationality': [{'$': 'U.S.A.'}, {'$': 'France'}],
+        'genre': [{'$': 'Drame'}, {'$': 'Comédie'}],
+        'castingShort': {'directors': 'Jean Dupont', 'actors': 'Anne Martin, Paul Durand'},
+        'statistics': {'userRating': 3.8},
+    },
+    1002: {
+        'code': 1002,
+        'title': 'Petit Film',
+        'originalTitle': 'Petit Film',
+        'productionYear': 2020,
+        'runtime': 4800,
+        'synopsis': 'Un petit film.',
+        'nationality': [{'$': 'Belgique'}],
+        'genre': [{'$': 'Animation'}],
+        'castingShort': {'directors': 'Marie Curie', 'actors': 'Pierre Curie'},
+        'statistics': {'userRating': 'NaN?'},
+    },
+    1003: {
+        'code': 1003,
+        'title': 'Nuit Blanche',
+        'originalTitle': 'Nuit Blanche',
+        'productionYear': '2018',
+        'runtime': None,
+        'synopsis': None,
+        'nationality': [{'$': 'Japon'}],
+        'genre': [{'$': 'Thriller'}],
+        'castingShort': {'directors': 'Akira K.', 'actors': 'Toshiro M.'},
+        'statistics': {},
+    },
+}
+
+
+def _raw_movie_showtime(movie_id, language, screen_format, days):
+    movie = MOVIES[movie_id]
+    return {
+        'onShow': {'movie': {
+            'code': movie_id,
+            'title': movie['title'],
+            'runtime': movie['runtime'],
+            'statistics': movie['statistics'],
+        }},
+        'version': {'$': language},
+        'screenFormat': {'$': screen_format},
+        'scr': [{'d': day, 't': [{'$': hour} for hour in hours]} for day, hours in days],
+    }
+
+
+def _raw_theater(code, name, distance=None, movie_showtimes=()):
+    theater = {
+        'code': code,
+        'name': name,
+        'address': f'{code} rue du Cinéma',
+        'postalCode': '75001',
+        'city': 'Paris',
+    }
+    if distance is not None:
+        theater['distance'] = distance
+    return {'place': {'theater': theater}, 'movieShowtimes': list(movie_showtimes)}
+
+
+def _build_theaters():
+    week = ['2020-03-0{}'.format(day) for day in range(4, 10)]
+    theaters = {}
+    for index in range(1, 13):
+        code = 'P{:04d}'.format(index)
+        theaters[code] = _raw_theater(code, f'Cinéma {index}', movie_showtimes=[
+            _raw_movie_showtime(1001, 'Français', 'Numérique', [(day, ['14:00', '20:30']) for day in week]),
+            _raw_movie_showtime(1001, 'Anglais', 'IMAX 3D', [(week[0], ['17:15'])]),
+            _raw_movie_showtime(1002, 'Français', 'Numérique', [(week[1], ['10:40']), (week[2], ['10:40'])]),
+            _raw_movie_showtime(1003, 'Japonais', 'Numérique', [(week[3], ['22:00', '00:30'])]),
+        ])
+    return theaters
+
+
+THEATERS = _build_theaters()
+GEOCODE = 115755
+FAR_THEATER = _raw_theater('P9999', 'Cinéma lointain', distance=3)
+
+
+class StubFeeds:
+    """ The feeds of the tests: 12 theaters (and a far one for the geocode), showing 3 movies.
+    failing_requests: (parameter, value) of the showtimelist requests answering 500, e.g. ('page', '2')
+    """
+
+    def __init__(self):
+        self.failing_requests = set()
+
+    def route(self, path, query):
+        if path == '/showtimelist':
+            if self.failing_requests.intersection(query.items()):
+                return 500, {}
+            if 'theaters' in query:
+                codes = query['theaters'].split(',')
+                theaters = [THEATERS[code] for code in codes if code in THEATERS]
+            else:
+                theaters = list(THEATERS.values()) + [FAR_THEATER]
+            return 200, self._paginate(theaters, int(query.get('page', 1)), int(query.get('count', 10)))
+        if path == '/movie':
+            return 200, {'movie': MOVIES[int(query['code'])]}
+        if path == '/theater':
+            theater = THEATERS.get(query['code'])
+            return 200, {'theater': theater['place']['theater'] if theater else None}
+        return 404, {}
+
+    @staticmethod
+    def _paginate(theaters, page, count):
+        start = (page - 1) * count
+        return {'feed': {
+            'page': page,
+            'count': count,
+            'totalResults': len(theaters),
+            'theaterShowtimes': theaters[start:start + count],
+        }}
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer(StubFeeds()).start()
+    yield server
+    Client.clear_instances()  # Forgets the clients of this server
+    clear_shared_throttles()
+    clear_shared_movie_caches()
+    server.stop()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `allocine.aio`, against the local stub of the Allociné API."""
+
+# To be tested with : python3 -m pytest -vs tests/test_aio.py
+
+import asyncio
+
+import pytest
+from allocine import Allocine
+
+pytest.importorskip('aiohttp')
+from allocine.aio import AsyncAllocine  # noqa: E402
+
+
+def test_async_get_theater(stub_server):
+    async def get_theaters():
+        async with AsyncAllocine(base_url=stub_server.base_url) as allocine:
+            return await asyncio.gather(*[allocine.get_theater(theater_id=f'P000{i}') for i in range(1, 6)])
+
+    theaters = asyncio.run(get_theaters())
+    assert [t.theater_id for t in theaters] == ['P0001', 'P0002', 'P0003', 'P0004', 'P0005']
+    assert stub_server.count('/movie') == 3  # Shared between the concurrent parsings
+
+    expected = Allocine(base_url=stub_server.base_url).get_theater(theater_id='P0001')
+    assert theaters[0].showtimes == expected.showtimes
+
+
+def test_async_search_theaters(stub_server):
+    async def search_theaters():
+        async with AsyncAllocine(base_url=stub_server.base_url) as allocine:
+            return await allocine.search_theaters(geocode=115755)
+
+    theaters = asyncio.run(search_theaters())
+    assert len(theaters) == 12  # The far away theater is excluded
+
+
+def test_async_retry_on_503(stub_server):
+    stub_server.next_503 = 2
+
+    async def get_movie_info():
+        async with AsyncAllocine(base_url=stub_server.base_url) as allocine:
+            return await allocine.get_movie_info(1001)
+
+    assert asyncio.run(get_movie_info())['title'] == 'Le Grand Film'
+    assert stub_server.count('/movie') == 3
+
+
+def test_async_errors(stub_server):
+    async def get_theater():
+        async with AsyncAllocine(base_url=stub_server.base_url) as allocine:
+            return await allocine.get_theater(theater_id='UNKNOWN')
+
+    with pytest.raises(ValueError):
+        asyncio.run(get_theater())
@@ -5,8 +5,12 @@
 
 # To be tested with : python3 -m pytest -vs tests/test_allocine.py
 
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
 import pytest
-from allocine import Allocine
+from allocine import Allocine, BaseClient, Client, TheatersNotFound
+from allocine.cache import MemoryMovieCache
 
 
 def test_class_Theater():
@@ -23,3 +27,119 @@ def test_class_Allocine_errors():
     allocine = Allocine()
     with pytest.raises(ValueError):
         allocine.get_theater(theater_id="UNKOWN")
+
+
+def test_get_theater_prefetch_movies_concurrently(stub_server):
+    sequential_theater = Allocine(base_url=stub_server.base_url).get_theater(theater_id='P0001')
+    movie_requests = stub_server.count('/movie')
+
+    theater = Allocine(base_url=stub_server.base_url, max_workers=4,
+                       movie_cache=MemoryMovieCache()).get_theater(theater_id='P0001')
+    assert stub_server.count('/movie') - movie_requests == 3  # One request per distinct movie
+    assert theater.showtimes == sequential_theater.showtimes
+    assert [s.movie.synopsis for s in theater.showtimes] == [s.movie.synopsis for s in sequential_theater.showtimes]
+
+
+def test_movie_cache_shared_by_default(stub_server):
+    Allocine(base_url=stub_server.base_url).get_theater(theater_id='P0001')
+    Allocine(base_url=stub_server.base_url, max_workers=4).get_theater(theater_id='P0002')
+
+    assert stub_server.count('/movie') == 3
+
+
+def test_movie_cache_per_base_url(stub_server):
+    other_base_url = stub_server.base_url.replace('127.0.0.1', 'localhost')
+    Allocine(base_url=stub_server.base_url).get_theater(theater_id='P0001')
+    Allocine(base_url=other_base_url).get_theater(theater_id='P0001')
+
+    assert stub_server.count('/movie') == 6
+
+
+def test_concurrent_theaters_share_movie_requests(stub_server):
+    allocine = Allocine(base_url=stub_server.base_url)
+    theater_ids = ['P{:04d}'.format(i) for i in range(1, 13)]
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        list(executor.map(allocine.get_theater, theater_ids))
+
+    assert stub_server.count('/movie') == 3
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_search_theaters_pages(stub_server, max_workers):
+    allocine = Allocine(base_url=stub_server.base_url, max_workers=max_workers)
+    theaters = allocine.search_theaters(geocode=115755, page_size=5)
+    # 13 results in 3 pages, without the theater too far away and without requesting an empty page
+    assert [t.theater_id for t in theaters] == ['P{:04d}'.format(i) for i in range(1, 13)]
+    assert stub_server.count('/showtimelist') == 3
+
+
+def test_get_theaters_in_batches(stub_server):
+    allocine = Allocine(base_url=stub_server.base_url, max_workers=2)
+    theater_ids = ['P{:04d}'.format(i) for i in range(12, 0, -1)]
+    theaters = allocine.get_theaters(theater_ids, batch_size=5)
+    assert list(theaters) == theater_ids
+    assert all(theater.theater_id == theater_id for theater_id, theater in theaters.items())
+    assert stub_server.count('/showtimelist') == 3
+
+
+def test_get_theaters_errors(stub_server):
+    allocine = Allocine(base_url=stub_server.base_url)
+    with pytest.raises(TheatersNotFound) as exc_info:
+        allocine.get_theaters(['P0001', 'UNKNOWN', 'P0002'])
+    assert exc_info.value.theater_ids == ['UNKNOWN']
+    assert list(exc_info.value.theaters) == ['P0001', 'P0002']
+
+
+def test_iter_theaters(stub_server):
+    allocine = Allocine(base_url=stub_server.base_url)
+    theaters = allocine.iter_theaters(geocode=115755, page_size=5)
+    first_theater = next(theaters)
+    assert first_theater.theater_id == 'P0001'
+    assert stub_server.count('/showtimelist') <= 2  # The last page was not requested yet
+    assert [t.theater_id for t in theaters] == ['P{:04d}'.format(i) for i in range(2, 13)]
+
+
+def test_iter_showtimes(stub_server):
+    theater = Allocine(base_url=stub_server.base_url).get_theater(theater_id='P0001')
+    movie_version = theater.showtimes[0].movie
+    day = theater.showtimes[0].date
+
+    assert list(theater.iter_showtimes()) == theater.showtimes
+    assert list(theater.iter_showtimes(movie_version=movie_version, date=day)) == \
+        theater.get_showtimes_of_a_movie(movie_version=movie_version, date=day)
+    assert list(theater.iter_showtimes(date=day)) == theater.get_showtimes_of_a_day(date=day)
+
+
+def test_one_client_per_base_url(stub_server):
+    client = Client(base_url=stub_server.base_url)
+
+    assert Client(stub_server.base_url) is client
+    assert Client(base_url='http://other.example') is not client
+    assert Client(base_url=stub_server.base_url, timeout=(1, 2)).timeout == (1, 2)
+
+
+def test_client_created_once_by_concurrent_threads(stub_server):
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        clients = list(executor.map(lambda _: Client(base_url=stub_server.base_url, pool_maxsize=32), range(64)))
+
+    assert len(set(map(id, clients))) == 1
+
+
+def test_threads_reuse_connections(stub_server, caplog):
+    allocine = Allocine(base_url=stub_server.base_url, max_workers=32)
+    theater_ids = ['P{:04d}'.format(i) for i in range(1, 13)] * 8
+
+    with caplog.at_level(logging.WARNING, logger='urllib3.connectionpool'):
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            theaters = list(executor.map(allocine.get_theater, theater_ids))
+
+    assert [t.theater_id for t in theaters] == theater_ids
+    assert 'Connection pool is full' not in caplog.text
+
+
+def test_client_without_get():
+    class IncompleteClient(BaseClient):
+        base_url = 'http://localhost'
+
+    with pytest.raises(TypeError):
+        IncompleteClient()
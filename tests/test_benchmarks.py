@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the synthetic feeds, the benchmark suite, the stub server and the load driver."""
+
+# To be tested with : python3 -m pytest -vs tests/test_benchmarks.py
+
+import pytest
+import requests
+
+from allocine import Allocine
+from benchmarks.bench import BENCHMARKS, run_benchmarks
+from benchmarks.feeds import FeedGenerator, SyntheticClient
+from benchmarks.load import SCENARIOS, run_scenarios
+from benchmarks.stub_server import RecordedFeeds, StubServer
+
+
+def test_feeds_are_deterministic():
+    assert FeedGenerator(seed=1).showtimelist() == FeedGenerator(seed=1).showtimelist()
+    assert FeedGenerator(seed=1).movie(100001) == FeedGenerator(seed=1).movie(100001)
+    assert FeedGenerator(seed=1).showtimelist() != FeedGenerator(seed=2).showtimelist()
+
+
+def test_synthetic_client():
+    generator = FeedGenerator(theaters=7, movies=3, days=2, showtimes_per_day=2)
+    client = SyntheticClient(generator)
+    theaters = Allocine(client=client).search_theaters(geocode=1, page_size=5)
+
+    assert [t.theater_id for t in theaters] == generator.theater_ids
+    for theater in theaters:
+        assert len({s.movie.movie_id for s in theater.showtimes}) == 3
+        assert len(theater.get_showtimes_of_a_movie(theater.showtimes[0].movie)) == 2 * 2
+    assert client.requests == 2 + len({s.movie.movie_id for t in theaters for s in t.showtimes})
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(FeedGenerator(theaters=2, movies=2, days=2, showtimes_per_day=2), repeat=1)
+
+    assert set(results) == set(BENCHMARKS)
+    for result in results.values():
+        assert result['wall_time_s']['min'] > 0
+        assert result['peak_memory_bytes'] >= 0
+
+
+@pytest.fixture
+def load_server():
+    with StubServer(FeedGenerator(theaters=4, movies=2, days=2, showtimes_per_day=2)) as server:
+        yield server
+
+
+def test_stub_server_injects_503(load_server):
+    load_server.error_rate = 1
+    ret = requests.get(f'{load_server.base_url}/movie?code=100001')
+
+    assert ret.status_code == 503
+    assert load_server.stats() == {'requests': {'/movie': 1}, 'errors_503': 1}
+
+
+def test_stub_server_serves_recorded_feeds():
+    with StubServer(RecordedFeeds()) as server:
+        feed = requests.get(f'{server.base_url}/showtimelist?geocode=1&page=2&count=2').json()['feed']
+        movie = requests.get(f'{server.base_url}/movie?code=258374').json()
+
+    assert feed['totalResults'] == 3
+    assert len(feed['theaterShowtimes']) == 1
+    assert movie['movie']['code'] == 258374
+
+
+def test_run_scenarios(load_server):
+    results = run_scenarios(load_server.base_url, ['B0001', 'B0002', 'B0003', 'B0004'], workers=2, rounds=2,
+                            server=load_server)
+
+    assert set(results) >= set(SCENARIOS)
+    for result in results.values():
+        assert result['errors'] == 0
+        assert result['retries_503'] == 0
+        assert result['theaters'] == 8
+        assert result['latency_s']['p50'] <= result['latency_s']['p100']
+    assert results['get_theaters']['requests'] == 2 + 4  # One per round, and the 4 movies on the first round only
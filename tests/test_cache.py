@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `allocine.cache`."""
+
+# To be tested with : python3 -m pytest -vs tests/test_cache.py
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import threading
+import time
+
+import pytest
+from allocine import Allocine, Client
+from allocine.cache import MemoryMovieCache, MovieCache, ResponseCache, SQLiteMovieCache
+
+
+def test_sqlite_movie_cache(tmp_path):
+    cache = SQLiteMovieCache(path=tmp_path / 'movies.sqlite')
+    assert cache.get(1001) is None
+
+    cache.set(1001, {'code': 1001, 'title': 'Le Grand Film'})
+    assert cache.get(1001) == {'code': 1001, 'title': 'Le Grand Film'}
+    # Visible from another connection (ex: another process)
+    assert SQLiteMovieCache(path=tmp_path / 'movies.sqlite').get(1001)['title'] == 'Le Grand Film'
+
+
+def test_sqlite_movie_cache_ttl(tmp_path):
+    cache = SQLiteMovieCache(path=tmp_path / 'movies.sqlite', ttl=timedelta(days=1))
+    cache.set(1001, {'code': 1001})
+    cache.set(1002, {'code': 1002}, ttl=timedelta(seconds=-1))  # Already expired
+    assert cache.get(1001) == {'code': 1001}
+    assert cache.get(1002) is None
+
+
+def test_sqlite_movie_cache_eviction(tmp_path):
+    cache = SQLiteMovieCache(path=tmp_path / 'movies.sqlite', max_entries=3)
+    for movie_id in range(10):
+        cache.set(movie_id, {'code': movie_id})
+    assert len(cache) == 3
+    assert [cache.get(movie_id) is not None for movie_id in range(10)] == [False] * 7 + [True] * 3
+
+
+def test_movie_cache_without_set():
+    class IncompleteMovieCache(MovieCache):
+        def get(self, movie_id):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteMovieCache()
+
+
+def test_allocine_reads_through_movie_cache(stub_server, tmp_path):
+    theater = Allocine(
+        base_url=stub_server.base_url,
+        movie_cache=SQLiteMovieCache(path=tmp_path / 'movies.sqlite'),
+    ).get_theater(theater_id='P0001')
+    assert stub_server.count('/movie') == 3
+
+    # A new run does not request the movies again
+    cached_theater = Allocine(
+        base_url=stub_server.base_url,
+        movie_cache=SQLiteMovieCache(path=tmp_path / 'movies.sqlite'),
+    ).get_theater(theater_id='P0001')
+    assert stub_server.count('/movie') == 3
+    assert [s.movie.synopsis for s in cached_theater.showtimes] == [s.movie.synopsis for s in theater.showtimes]
+
+
+def test_response_cache_conditional_requests(stub_server):
+    allocine = Allocine(base_url=stub_server.base_url, response_cache=ResponseCache())
+    theater = allocine.get_theater(theater_id='P0001')
+    polled_theater = allocine.get_theater(theater_id='P0001')
+    assert stub_server.count('/showtimelist') == 2
+    assert stub_server.not_modified == 1  # The cached feed was served for the 2nd request
+    assert polled_theater.showtimes == theater.showtimes
+
+
+def test_response_cache_fresh_ttl(stub_server):
+    client = Client(base_url=stub_server.base_url, response_cache=ResponseCache(fresh_ttl=timedelta(minutes=5)))
+    feed = client.get_showtimelist_by_theater_id(theater_id='P0001')
+    assert client.get_showtimelist_by_theater_id(theater_id='P0001') is feed
+    assert stub_server.count('/showtimelist') == 1
+
+
+def test_response_cache_eviction():
+    cache = ResponseCache(max_entries=2)
+    for url in ('a', 'b', 'c'):
+        cache.set(url, {'url': url}, etag=f'"{url}"')
+    assert cache.get('a') is None
+    assert cache.get('c').validators == {'If-None-Match': '"c"'}
+
+
+def test_movie_cache_single_flight():
+    cache = MemoryMovieCache()
+    fetches = []
+    all_waiting = threading.Barrier(8)
+
+    def fetch(movie_id):
+        fetches.append(movie_id)
+        time.sleep(0.2)  # The other threads ask for the movie meanwhile
+        return {'code': movie_id}
+
+    def get_movie_info(movie_id):
+        all_waiting.wait()
+        return cache.get_or_fetch(movie_id, fetch)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        movie_infos = list(executor.map(get_movie_info, [1001] * 4 + [1002] * 4))
+
+    assert sorted(fetches) == [1001, 1002]
+    assert movie_infos == [{'code': 1001}] * 4 + [{'code': 1002}] * 4
+    assert cache.get(1001) == {'code': 1001}
+
+
+def test_movie_cache_single_flight_error():
+    cache = MemoryMovieCache()
+
+    def fetch(movie_id):
+        raise ValueError('503')
+
+    with pytest.raises(ValueError):
+        cache.get_or_fetch(1001, fetch)
+    assert cache.get_or_fetch(1001, lambda movie_id: {'code': movie_id}) == {'code': 1001}
+
+
+def test_memory_movie_cache_eviction():
+    cache = MemoryMovieCache(max_entries=2)
+    cache.set(1, {'code': 1})
+    cache.set(2, {'code': 2})
+    cache.get(1)
+    cache.set(3, {'code': 3})
+
+    assert cache.get(2) is None
+    assert len(cache) == 2
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests of the modules imported at startup, with `python -X importtime`."""
+
+# To be tested with : python3 -m pytest -vs tests/test_imports.py
+
+from pathlib import Path
+import subprocess
+import sys
+
+ROOT_PATH = Path(__file__).parent.parent
+
+# Slow to import, and not needed to start the CLI
+LAZY_MODULES = ['requests', 'urllib3', 'backoff', 'asyncio', 'jmespath', 'prettytable', 'allocine.nationalities',
+                'cProfile', 'pstats']
+
+
+def get_imports(code):
+    """ {module: cumulative import time in µs} of the modules imported by code (not by the site module) """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT_PATH,
+                             capture_output=True, text=True, check=True)
+    imports = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        if module.strip() == 'site':
+            imports.clear()  # Imported before the code
+            continue
+        imports[module.strip()] = int(cumulative)
+    return imports
+
+
+def get_slowest(imports, count=10):
+    return ', '.join('{} ({:.1f} ms)'.format(module, duration / 1000)
+                     for module, duration in sorted(imports.items(), key=lambda item: -item[1])[:count])
+
+
+def test_cli_imports():
+    imports = get_imports('import seances')
+
+    assert 'seances' in imports
+    assert [module for module in LAZY_MODULES if module in imports] == [], get_slowest(imports)
+
+
+def test_client_imports():
+    imports = get_imports('import allocine; allocine.Allocine(base_url="http://localhost")')
+
+    assert 'requests' in imports
+    assert 'backoff' not in imports  # Until the first request
+    assert 'jmespath' not in imports
+
+
+def test_lazy_modules():
+    import allocine
+    from allocine import parsing
+
+    assert allocine.nationalities.nationalities['FR'] == ('français', 'française')
+    assert parsing.JMESPATH_ACCESSORS is parsing.JMESPATH_ACCESSORS
+    assert parsing.JMESPATH_ACCESSORS.total_results({'feed': {'totalResults': 3}}) == 3
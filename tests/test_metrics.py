@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `allocine.metrics`."""
+
+# To be tested with : python3 -m pytest -vs tests/test_metrics.py
+
+from datetime import timedelta
+
+import pytest
+from allocine import Allocine, metrics
+from allocine.cache import ResponseCache
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.MetricsRegistry()
+    metrics.set_sink(registry)
+    yield registry
+    metrics.set_sink(None)
+
+
+def test_registry():
+    registry = metrics.MetricsRegistry()
+    registry.increment(metrics.REQUESTS, endpoint='movie', status=200)
+    registry.increment(metrics.REQUESTS, endpoint='movie', status=200)
+    registry.observe(metrics.REQUEST_DURATION, 0.03, endpoint='movie')
+    registry.observe(metrics.REQUEST_DURATION, 20, endpoint='movie')
+
+    assert registry.get_counter(metrics.REQUESTS, status=200, endpoint='movie') == 2
+    assert registry.get_counter(metrics.REQUESTS, endpoint='theater', status=200) == 0
+    histogram = registry.get_histogram(metrics.REQUEST_DURATION, endpoint='movie')
+    assert (histogram.count, histogram.sum) == (2, 20.03)
+    assert list(histogram.cumulative_counts())[-2:] == [1, 2]  # 20 seconds is above the last bucket
+
+
+def test_prometheus_text_format():
+    registry = metrics.MetricsRegistry()
+    registry.increment(metrics.MOVIE_CACHE, result='hit')
+    registry.observe(metrics.RESPONSE_SIZE, 2048, endpoint='movie')
+
+    assert registry.to_prometheus() == '\n'.join([
+        '# HELP allocine_movie_cache_total ' + metrics.METRICS[metrics.MOVIE_CACHE][1],
+        '# TYPE allocine_movie_cache_total counter',
+        'allocine_movie_cache_total{result="hit"} 1',
+        '# HELP allocine_response_size_bytes ' + metrics.METRICS[metrics.RESPONSE_SIZE][1],
+        '# TYPE allocine_response_size_bytes histogram',
+        'allocine_response_size_bytes_bucket{endpoint="movie",le="1000"} 0',
+        'allocine_response_size_bytes_bucket{endpoint="movie",le="10000"} 1',
+        'allocine_response_size_bytes_bucket{endpoint="movie",le="100000"} 1',
+        'allocine_response_size_bytes_bucket{endpoint="movie",le="1000000"} 1',
+        'allocine_response_size_bytes_bucket{endpoint="movie",le="10000000"} 1',
+        'allocine_response_size_bytes_bucket{endpoint="movie",le="+Inf"} 1',
+        'allocine_response_size_bytes_sum{endpoint="movie"} 2048',
+        'allocine_response_size_bytes_count{endpoint="movie"} 1',
+    ]) + '\n'
+
+
+def test_prometheus_statuses_of_an_endpoint():
+    registry = metrics.MetricsRegistry()
+    registry.increment(metrics.REQUESTS, endpoint='movie', status='error')  # No answer
+    registry.increment(metrics.REQUESTS, endpoint='movie', status=200)
+
+    assert registry.to_prometheus().splitlines()[2:] == [
+        'allocine_requests_total{endpoint="movie",status="200"} 1',
+        'allocine_requests_total{endpoint="movie",status="error"} 1',
+    ]
+    assert registry.get_counter(metrics.REQUESTS, endpoint='movie', status=200) == 1
+
+
+def test_allocine_metrics(stub_server, registry):
+    allocine = Allocine(base_url=stub_server.base_url)
+    stub_server.next_503 = 1
+    allocine.get_theater('P0001')
+    allocine.get_theater('P0002')
+
+    assert registry.get_counter(metrics.REQUESTS, endpoint='showtimelist_theaters', status=503) == 1
+    assert registry.get_counter(metrics.REQUESTS, endpoint='showtimelist_theaters', status=200) == 2
+    assert registry.get_counter(metrics.REQUESTS, endpoint='movie', status=200) == 3
+    assert registry.get_counter(metrics.RETRIES, endpoint='showtimelist_theaters') == 1
+    assert registry.get_counter(metrics.RETRY_WAIT, endpoint='showtimelist_theaters') >= 0
+    assert registry.get_histogram(metrics.REQUEST_DURATION, endpoint='movie').count == 3
+    assert registry.get_histogram(metrics.RESPONSE_SIZE, endpoint='movie').sum > 0
+    assert registry.get_histogram(metrics.JSON_DECODE_DURATION, endpoint='showtimelist_theaters').count == 2
+    assert registry.get_histogram(metrics.THEATER_PARSE_DURATION).count == 2
+    assert registry.get_counter(metrics.MOVIE_CACHE, result='miss') == 3
+    assert registry.get_counter(metrics.MOVIE_CACHE, result='hit') == 3  # The 3 movies of the second theater
+
+
+def test_response_cache_metrics(stub_server, registry):
+    allocine = Allocine(base_url=stub_server.base_url,
+                        response_cache=ResponseCache(fresh_ttl=timedelta(minutes=5)))
+    allocine.get_theater('P0001')
+    allocine.get_theater('P0001')
+
+    assert registry.get_counter(metrics.REQUESTS, endpoint='showtimelist_theaters', status=200) == 1
+    assert registry.get_counter(metrics.RESPONSE_CACHE, endpoint='showtimelist_theaters', result='fresh') == 1
+
+
+def test_default_sink_ignores_metrics(stub_server):
+    assert type(metrics.get_sink()) is metrics.MetricsSink
+    Allocine(base_url=stub_server.base_url).get_theater('P0001')
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `allocine.nationalities`."""
+
+# To be tested with : python3 -m pytest -vs tests/test_nationalities.py
+
+from dataclasses import replace
+import logging
+
+import pytest
+
+from allocine import Movie
+from allocine.nationalities import country_index, get_nationality, normalize_country_name
+
+AMERICAN = ('américain', 'américaine')
+
+
+@pytest.mark.parametrize('country_name', ['U.S.A.', 'u.s.a.', 'USA', 'États-Unis', 'Etats-Unis', ' etats-unis '])
+def test_spellings(country_name):
+    assert get_nationality(country_name) == AMERICAN
+
+
+def test_index():
+    assert country_index['cote d\'ivoire'] == 'CI'
+    assert country_index['royaume-uni'] == country_index['grande-bretagne'] == 'GB'
+    assert all(name == normalize_country_name(name) for name in country_index)
+    assert 'curacao' not in country_index  # No nationality for its code
+
+
+def test_unknown_country_logged_once(caplog):
+    get_nationality.cache_clear()
+    with caplog.at_level(logging.WARNING, logger='allocine.nationalities'):
+        for _ in range(3):
+            assert get_nationality('Groland') == ('de Groland', 'de Groland')
+            assert get_nationality('Curaçao') == ('de Curaçao', 'de Curaçao')
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Country 'Groland' not found in nationalities",
+        "Country 'Curaçao' not found in nationalities",
+    ]
+
+
+def test_movie_nationalities():
+    movie = Movie(movie_id=1, title='Film', original_title='Film', rating=None, duration=None, genres='',
+                  countries=['U.S.A.', 'France'], directors='', actors='', synopsis='', year=2020)
+
+    assert movie.nationalities == [AMERICAN, ('français', 'française')]
+    assert replace(movie, countries=[]).nationalities is None
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `allocine.parsing`: the fast accessors against the jmespath ones."""
+
+# To be tested with : python3 -m pytest -vs tests/test_parsing.py
+
+from dataclasses import asdict
+import json
+from pathlib import Path
+
+import pytest
+from allocine import _get_movie_ids, _get_theater_showtimes, _parse_theaters
+from allocine.parsing import FAST_ACCESSORS, JMESPATH_ACCESSORS
+from benchmarks.feeds import FeedGenerator
+
+DATA_PATH = Path(__file__).parent / 'data'
+
+
+@pytest.fixture
+def recorded_feed():
+    with open(DATA_PATH / 'showtimelist_geocode.json', encoding='utf-8') as feed_file:
+        return json.load(feed_file)
+
+
+@pytest.fixture
+def recorded_movies():
+    with open(DATA_PATH / 'movies.json', encoding='utf-8') as movies_file:
+        return {int(code): movie['movie'] for code, movie in json.load(movies_file).items()}
+
+
+def parse(raw_showtimelist, movies, accessors):
+    raw_theater_showtimes = _get_theater_showtimes(raw_showtimelist, distance_max_inclusive=0, accessors=accessors)
+    return _parse_theaters(raw_theater_showtimes, get_movie_info=movies.__getitem__, accessors=accessors)
+
+
+def test_fast_accessors_give_the_same_models(recorded_feed, recorded_movies):
+    theaters = parse(recorded_feed, recorded_movies, accessors=FAST_ACCESSORS)
+    reference_theaters = parse(recorded_feed, recorded_movies, accessors=JMESPATH_ACCESSORS)
+
+    assert [t.theater_id for t in theaters] == ['P0645', 'C0159']
+    assert [asdict(t) for t in theaters] == [asdict(t) for t in reference_theaters]
+
+
+def test_fast_accessors_on_incomplete_feeds(recorded_feed):
+    raw_showtime = recorded_feed['feed']['theaterShowtimes'][0]['movieShowtimes'][3]
+    for node in ({}, {'onShow': None}, {'onShow': {'movie': []}}, {'version': 'VF'}, raw_showtime):
+        for accessor in ('raw_movie', 'movie_code', 'language', 'screen_format'):
+            assert getattr(FAST_ACCESSORS, accessor)(node) == getattr(JMESPATH_ACCESSORS, accessor)(node)
+
+    for movie_info in ({}, {'genre': None}, {'genre': {'$': 'Drame'}}, {'genre': [None, 'Drame', [[{'$': 'x'}]]]}):
+        assert FAST_ACCESSORS.genres(movie_info) == JMESPATH_ACCESSORS.genres(movie_info)
+
+
+def test_movie_ids(recorded_feed):
+    raw_theater_showtimes = _get_theater_showtimes(recorded_feed, distance_max_inclusive=0)
+    assert _get_movie_ids(raw_theater_showtimes) == [258374, 264394, 270180, 275066]
+
+
+def test_runtime_and_rating_of_each_entry():
+    generator = FeedGenerator(theaters=6, movies=6, days=1, showtimes_per_day=1)
+    feed = generator.showtimelist(count=6)
+    movies = {movie_id: generator.movie(movie_id)['movie'] for movie_id in generator.movie_ids}
+    theaters = _parse_theaters(_get_theater_showtimes(feed), get_movie_info=movies.__getitem__)
+
+    for theater, raw_theater in zip(theaters, feed['feed']['theaterShowtimes']):
+        expected = [(s['onShow']['movie']['runtime'], s['onShow']['movie']['statistics']['userRating'])
+                    for s in raw_theater['movieShowtimes']]
+        parsed = [(int(s.movie.duration.total_seconds()), s.movie.rating) for s in theater.showtimes]
+        assert parsed == expected
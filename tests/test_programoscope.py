@@ -13,6 +13,8 @@ from allocine import (
     check_schedules_within_week,
     create_weekdays_str,
     Schedule,
+    weekly_schedule_cache_clear,
+    weekly_schedule_cache_info,
 )
 
 
@@ -226,3 +228,30 @@ def test_create_weekdays_str():
 
     dates.append(date(year=2020, month=3, day=8))
     assert create_weekdays_str(dates) == ''
+
+
+def test_night_time_in_a_group():
+    schedules = [Schedule(date_time=datetime(year=2020, month=3, day=day, hour=hour, minute=minute))
+                 for day in (4, 5) for hour, minute in ((22, 0), (0, 30))]
+    schedule_str = build_weekly_schedule_str(schedules)
+    assert schedule_str == 'Mer, Jeu 0h30, 22h'
+
+
+def test_groups_sorted_by_first_hour():
+    schedules = []
+    schedules += [Schedule(date_time=datetime(year=2020, month=3, day=day, hour=10, minute=0))
+                  for day in (8, 9, 10)]
+    schedules += [Schedule(date_time=datetime(year=2020, month=3, day=day, hour=21, minute=0))
+                  for day in (4, 5, 6, 9, 10)]
+    schedule_str = build_weekly_schedule_str(schedules)
+    assert schedule_str == 'Dim, Lun, Mar 10h; sf Sam, Dim 21h'
+
+
+def test_weekly_schedule_cache():
+    weekly_schedule_cache_clear()
+    for week_start in (4, 11, 18):  # Same showtimes, 3 different weeks
+        schedules = [Schedule(date_time=datetime(year=2020, month=3, day=day, hour=hour, minute=0))
+                     for day in range(week_start, week_start + 7) for hour in (14, 20)]
+        assert build_weekly_schedule_str(schedules) == '14h, 20h'
+    cache_info = weekly_schedule_cache_info()
+    assert (cache_info.hits, cache_info.misses) == (2, 1)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the `seances` CLI, against the stub Allociné API."""
+
+# To be tested with : python3 -m pytest -vs tests/test_seances.py
+
+import csv
+from datetime import timedelta
+from functools import partial
+import io
+import json
+import pstats
+
+from click.testing import CliRunner
+from prettytable import PrettyTable, UNICODE, ALL, FRAME
+import pytest
+
+from allocine import Allocine
+import seances
+
+
+def theater_names(output):
+    return [line.split(', le ')[0] for line in output.splitlines() if ', le ' in line]
+
+
+@pytest.fixture
+def cli(stub_server, monkeypatch):
+    monkeypatch.setattr(seances, 'Allocine', partial(Allocine, base_url=stub_server.base_url))
+    return lambda *args: CliRunner().invoke(seances.main, args, catch_exceptions=False)
+
+
+def test_showtimes(cli):
+    result = cli('P0001', '--jour', '04/03/2020')
+
+    assert result.exit_code == 0
+    assert result.output.startswith('Cinéma 1, le 04/03/2020\n')
+    assert 'Le Grand Film (VF) - 01h30' in result.output
+    assert 'Le Grand Film (VOST IMAX 3D) - 01h30' in result.output
+    assert 'Profil' not in result.output
+
+
+def test_several_theaters(cli, stub_server):
+    result = cli('P0003', 'P0001', 'P0002', 'P0001', '--jour', '04/03/2020')
+
+    assert result.exit_code == 0
+    assert theater_names(result.output) == ['Cinéma 3', 'Cinéma 1', 'Cinéma 2']
+    assert stub_server.count('/showtimelist') == 3
+    assert stub_server.count('/movie') == 3  # The theaters share the movie info
+
+
+def test_theaters_in_order_of_arrival(cli):
+    result = cli('P0003', 'P0001', 'P0002', '--jour', '04/03/2020', '--arrivee')
+
+    assert result.exit_code == 0
+    assert sorted(theater_names(result.output)) == ['Cinéma 1', 'Cinéma 2', 'Cinéma 3']
+
+
+def test_theater_not_found(cli):
+    result = cli('P0001', 'UNKNOWN', '--jour', '04/03/2020')
+
+    assert result.exit_code == 1
+    assert theater_names(result.stdout) == ['Cinéma 1']
+    assert result.stderr == 'Cinéma introuvable : UNKNOWN\n'
+
+
+def test_theaters_and_geocode(cli, stub_server):
+    result = cli('P0001', '--geocode', '115755')
+
+    assert result.exit_code == 2
+    assert 'pas les deux' in result.output
+    assert stub_server.requests == []
+
+
+def test_theater_error_is_not_a_missing_theater(cli, stub_server):
+    stub_server.feeds.failing_requests.add(('theaters', 'P0002'))
+
+    with pytest.raises(ValueError, match='received 500'):
+        cli('P0001', 'P0002', '--jour', '04/03/2020')
+
+
+def test_geocode_page_error_is_not_a_missing_geocode(cli, stub_server):
+    stub_server.feeds.failing_requests.add(('page', '2'))
+
+    with pytest.raises(ValueError, match='received 500'):
+        cli('--geocode', '115755', '--jour', '04/03/2020')
+
+
+def test_geocode(cli, stub_server):
+    result = cli('--geocode', '115755', '--jour', '04/03/2020')
+
+    assert result.exit_code == 0
+    assert theater_names(result.output) == ['Cinéma {}'.format(i) for i in range(1, 13)]  # Without the far one
+    assert stub_server.count('/movie') == 3
+
+
+def test_no_theater(cli):
+    result = CliRunner().invoke(seances.main, [])
+
+    assert result.exit_code == 2
+    assert 'ID_CINEMA' in result.output
+
+
+def test_ndjson(cli, monkeypatch):
+    monkeypatch.setattr(seances, '_format_table', None)  # Without PrettyTable
+    result = cli('P0001', 'P0002', '--jour', '04/03/2020', '--format', 'ndjson')
+
+    assert result.exit_code == 0
+    rows = [json.loads(line) for line in result.output.splitlines()]
+    assert len(rows) == 2 * 3
+    assert rows[0] == {
+        'theater_id': 'P0001',
+        'theater': 'Cinéma 1',
+        'date': '2020-03-04',
+        'movie_id': 1001,
+        'title': 'Le Grand Film',
+        'version': 'VF',
+        'duration': 90,
+        'rating': rows[0]['rating'],
+        'time': '14:00',
+    }
+    assert [row['time'] for row in rows[:3]] == ['14:00', '20:30', '17:15']
+    assert [row['theater_id'] for row in rows] == ['P0001'] * 3 + ['P0002'] * 3
+
+
+def test_json(cli):
+    result = cli('--geocode', '115755', '--semaine', '--format', 'json')
+
+    assert result.exit_code == 0
+    assert json.loads(result.output) == []  # The stub showtimes are in 2020
+
+    result = cli('P0001', '--jour', '05/03/2020', '-f', 'json')
+    rows = json.loads(result.output)
+    assert [(row['title'], row['time']) for row in rows] == [
+        ('Le Grand Film', '14:00'), ('Le Grand Film', '20:30'), ('Petit Film', '10:40')]
+
+
+def test_csv(cli):
+    result = cli('P0001', 'UNKNOWN', '--jour', '04/03/2020', '--format', 'csv')
+
+    assert result.exit_code == 1
+    rows = list(csv.DictReader(io.StringIO(result.stdout)))
+    assert list(rows[0]) == seances.SHOWTIME_FIELDS
+    assert [(row['theater_id'], row['version'], row['time']) for row in rows] == [
+        ('P0001', 'VF', '14:00'), ('P0001', 'VF', '20:30'), ('P0001', 'VOST IMAX 3D', '17:15')]
+    assert result.stderr == 'Cinéma introuvable : UNKNOWN\n'
+
+
+def get_reference_table(theater, entrelignes, day):
+    """ The table of a day, as it was built from the indexes of the theater, with PrettyTable sorting the rows """
+    rows = []
+    for movie_version in theater.get_movies_available_for_a_day(date=day):
+        title = movie_version.title if len(movie_version.title) < 31 else movie_version.title[:31] + '...'
+        row = {'*1_film': f'{title} ({movie_version.version}) - {movie_version.duration_str}',
+               '*2_note': f'{movie_version.rating_str}*'}
+        for showtime in theater.get_showtimes_of_a_movie(movie_version=movie_version, date=day):
+            row[showtime.hour_str.split(':')[0]] = showtime.hour_str
+        rows.append(row)
+    if not rows:
+        return day.strftime('%d/%m/%Y') + '\nAucune séance'
+
+    table = PrettyTable()
+    table.set_style(UNICODE)
+    table.header = False
+    table.hrules = ALL if entrelignes else FRAME
+    table.field_names = seances.extract_field_names(rows)
+    for row in rows:
+        table.add_row([row.get(field_name, '') for field_name in table.field_names])
+    table.align['*1_film'] = 'l'
+    table.sortby = '*1_film'
+    return day.strftime('%d/%m/%Y') + '\n' + str(table)
+
+
+@pytest.mark.parametrize('entrelignes', [False, True])
+def test_week_tables(stub_server, entrelignes):
+    theater = Allocine(base_url=stub_server.base_url).get_theater(theater_id='P0001')
+    days = [theater.showtimes[0].date + timedelta(days=delta) for delta in range(-1, 8)]
+
+    tables = seances.get_showtime_tables(theater=theater, entrelignes=entrelignes,
+                                         jours=[day.strftime('%d/%m/%Y') for day in days])
+
+    assert tables == [get_reference_table(theater, entrelignes, day) for day in days]
+    assert tables[0].endswith('Aucune séance')
+    assert seances.get_showtime_table(theater=theater, entrelignes=entrelignes,
+                                      jour=days[1].strftime('%d/%m/%Y')) == tables[1]
+
+
+def test_profile(cli, tmp_path):
+    result = cli('P0001', '--jour', '04/03/2020', '--profile', '--pstats', str(tmp_path / 'seances.pstats'))
+
+    assert result.exit_code == 0
+    report = result.output[result.output.index('Profil :'):].splitlines()
+    stages = [line[:36].strip() for line in report[1:]]
+    assert stages == [
+        'import des modules',
+        'réseau movie',
+        'réseau showtimelist_theaters',
+        'décodage JSON',
+        'parsing des modèles',
+        'index et regroupements',
+        'rendu des tableaux (PrettyTable)',
+        'total (hors import)',
+    ]
+    assert report[2].endswith('3 requêtes')
+    assert report[3].endswith('1 requête')
+    assert pstats.Stats(str(tmp_path / 'seances.pstats')).total_calls > 0
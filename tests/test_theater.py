@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the `Theater` model (offline)."""
+
+# To be tested with : python3 -m pytest -vs tests/test_theater.py
+
+import copy
+from datetime import date, datetime, timedelta
+import pickle
+
+import pytest
+from allocine import Allocine, Movie, MovieVersion, Showtime, ShowtimeList, Theater
+
+
+def movie_version(movie_id, language='Français'):
+    movie = Movie(
+        movie_id=movie_id, title=f'Film {movie_id}', original_title=f'Film {movie_id}', rating=3.5,
+        duration=timedelta(hours=2), genres='Drame', countries=['France'], directors='', actors='',
+        synopsis='', year=2020)
+    return MovieVersion(movie=movie, language=language, screen_format='Numérique')
+
+
+@pytest.fixture(params=[list, ShowtimeList])
+def theater(request):
+    showtimes = request.param()
+    for day in range(4, 11):
+        for movie in (movie_version(1), movie_version(1, 'Anglais'), movie_version(2)):
+            for hour in (14, 20):
+                if movie.movie_id == 2 and day % 2:
+                    continue
+                showtimes.append(Showtime(date_time=datetime(2020, 3, day, hour), movie=movie))
+    return Theater(theater_id='P0001', name='Cinéma', showtimes=showtimes,
+                   address='', zipcode='75001', city='Paris')
+
+
+def linear_showtimes_of_a_movie(theater, movie, day):
+    return [s for s in theater.showtimes if s.movie == movie and s.date == day]
+
+
+def test_theater_indexes(theater):
+    for day in (date(2020, 3, day) for day in range(3, 12)):
+        assert theater.get_showtimes_of_a_day(day) == [s for s in theater.showtimes if s.date == day]
+        movies = theater.get_movies_available_for_a_day(day)
+        assert set(movies) == {s.movie for s in theater.showtimes if s.date == day}
+        for movie in movies:
+            assert theater.get_showtimes_of_a_movie(movie, day) == linear_showtimes_of_a_movie(theater, movie, day)
+    assert theater.get_showtimes_of_a_movie(movie_version(2)) == [s for s in theater.showtimes if s.movie.movie_id == 2]
+
+
+def test_theater_indexes_invalidation(theater):
+    day = date(2020, 3, 5)
+    assert movie_version(2) not in theater.get_movies_available_for_a_day(day)
+
+    theater.showtimes.append(Showtime(date_time=datetime(2020, 3, 5, 22), movie=movie_version(2)))
+    assert movie_version(2) in theater.get_movies_available_for_a_day(day)
+
+    del theater.showtimes[-1]
+    assert movie_version(2) not in theater.get_movies_available_for_a_day(day)
+
+    theater.showtimes[0] = Showtime(date_time=datetime(2020, 3, 5, 10), movie=movie_version(3))
+    assert theater.get_showtimes_of_a_movie(movie_version(3), day) == [theater.showtimes[0]]
+
+    theater.filter_showtimes(date_min=date(2020, 3, 6))
+    assert theater.get_showtimes_of_a_day(day) == []
+
+    theater.showtimes = []
+    assert theater.get_movies_available_for_a_day(date(2020, 3, 6)) == []
+
+
+@pytest.mark.parametrize('copy_theater', [lambda theater: pickle.loads(pickle.dumps(theater)), copy.deepcopy])
+def test_theater_copies(theater, copy_theater):
+    day = date(2020, 3, 4)
+    theater.get_showtimes_of_a_day(day)  # With its indexes
+
+    theater_copy = copy_theater(theater)
+    assert theater_copy.showtimes == theater.showtimes
+    assert theater_copy.showtimes[0].movie is not theater.showtimes[0].movie
+    assert theater_copy.showtimes[0].movie.movie is theater_copy.showtimes[1].movie.movie  # Still shared
+    assert theater_copy.get_showtimes_per_movie_version() == theater.get_showtimes_per_movie_version()
+    assert hash(theater_copy.showtimes[0].movie) == hash(theater.showtimes[0].movie)
+
+    theater_copy.showtimes.append(Showtime(date_time=datetime(2020, 3, 4, 22), movie=movie_version(3)))
+    assert movie_version(3) in theater_copy.get_movies_available_for_a_day(day)
+    assert movie_version(3) not in theater.get_movies_available_for_a_day(day)
+
+
+def test_theater_keeps_the_showtimes_list():
+    showtimes = [Showtime(date_time=datetime(2020, 3, 4, 14), movie=movie_version(1))]
+    theater = Theater(theater_id='P0001', name='Cinéma', showtimes=showtimes,
+                      address='', zipcode='75001', city='Paris')
+    assert theater.showtimes is showtimes
+    assert theater.get_movies_available_for_a_day(date(2020, 3, 5)) == []
+
+    showtimes.append(Showtime(date_time=datetime(2020, 3, 5, 14), movie=movie_version(2)))
+    assert theater.get_movies_available_for_a_day(date(2020, 3, 5)) == [movie_version(2)]
+
+
+def test_movie_versions_share_their_movie(stub_server):
+    theater = Allocine(base_url=stub_server.base_url).get_theater(theater_id='P0001')
+    versions = theater.get_showtimes_per_movie_version()
+    assert [str(v) for v in versions] == [
+        'Le Grand Film [1001] (01h30) (VF)',
+        'Le Grand Film [1001] (01h30) (VOST IMAX 3D)',
+        'Petit Film [1002] (01h20) (VF)',
+        'Nuit Blanche [1003] (HH:MM) (VOST)',
+    ]
+    vf, vost, petit_film, nuit_blanche = versions
+    assert vf.movie is vost.movie
+    assert vf.title == vost.title == 'Le Grand Film'
+    assert vf != vost and hash(vf) != hash(vost)
+    assert list(theater.get_showtimes_per_movie()) == [vf.movie, petit_film.movie, nuit_blanche.movie]
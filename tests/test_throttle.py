@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `allocine.throttle`."""
+
+# To be tested with : python3 -m pytest -vs tests/test_throttle.py
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from allocine import Allocine, Client
+from allocine.throttle import Throttle, get_shared_throttle
+
+
+def test_token_bucket_limits_the_rate():
+    throttle = Throttle(rate=20, burst=1, max_rate=20)
+    start = time.monotonic()
+    for _ in range(6):
+        throttle.release(throttle.acquire())
+
+    assert time.monotonic() - start >= 5 / 20 * 0.9
+
+
+def test_concurrency_limit():
+    throttle = Throttle(rate=1000, burst=100, concurrency=2, max_concurrency=2)
+    started_at = [throttle.acquire(), throttle.acquire()]
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (throttle.acquire(), acquired.set()))
+    thread.start()
+
+    assert not acquired.wait(timeout=0.2)
+    throttle.release(started_at[0])
+    assert acquired.wait(timeout=1)
+    thread.join()
+    assert throttle.limits['in_flight'] == 2
+
+
+def test_additive_increase_multiplicative_decrease():
+    throttle = Throttle(rate=100, min_rate=40, concurrency=4, cooldown=0)
+    for _ in range(4):
+        throttle.release(throttle.acquire())
+    assert throttle.limits['concurrency'] == 4 < throttle.concurrency < 5
+    assert 100 < throttle.rate < 100.1
+
+    throttle.release(throttle.acquire(), overloaded=True)
+    assert throttle.limits['concurrency'] == 2
+    assert 50 < throttle.rate < 50.1
+    assert throttle.limits['decreases'] == 1
+
+    for _ in range(10):
+        throttle.release(throttle.acquire(), overloaded=True)
+    assert throttle.limits['concurrency'] == throttle.min_concurrency
+    assert throttle.rate == throttle.min_rate
+
+
+def test_one_decrease_per_overload():
+    throttle = Throttle(concurrency=8)
+    started_at = [throttle.acquire() for _ in range(8)]
+    for start in started_at:  # All the requests in flight fail together
+        throttle.release(start, overloaded=True)
+
+    assert throttle.limits['concurrency'] == 4
+    assert throttle.limits['decreases'] == 1
+
+
+def test_latency_spike_is_an_overload():
+    throttle = Throttle(cooldown=0)
+    for _ in range(10):
+        throttle.release(throttle.acquire())
+    throttle.release(throttle.acquire() - 10)  # 10 seconds late
+
+    assert throttle.limits['decreases'] == 1
+
+
+def test_latency_spikes_per_endpoint():
+    throttle = Throttle(cooldown=0)
+    for _ in range(10):
+        throttle.release(throttle.acquire(), endpoint='movie')
+    for _ in range(10):
+        throttle.release(throttle.acquire() - 1, endpoint='showtimelist_geocode')  # Slow pages
+
+    assert throttle.limits['decreases'] == 0
+    assert throttle.limits['average_latencies']['showtimelist_geocode'] >= 1
+    throttle.release(throttle.acquire() - 10, endpoint='showtimelist_geocode')
+    assert throttle.limits['decreases'] == 1
+
+
+def test_client_throttle_on_503(stub_server):
+    throttle = Throttle(rate=100, concurrency=8)
+    allocine = Allocine(client=Client(base_url=stub_server.base_url, throttle=throttle))
+    stub_server.next_503 = 1
+
+    assert allocine.get_theater('P0001').theater_id == 'P0001'
+    assert throttle.limits['decreases'] == 1
+    assert throttle.limits['concurrency'] == 4
+    assert throttle.limits['in_flight'] == 0
+
+
+def test_throttle_shared_per_host(stub_server):
+    client = Client(base_url=stub_server.base_url)
+    other_client = Client(base_url=stub_server.base_url, timeout=(1, 2))
+
+    assert other_client is not client
+    assert other_client.throttle is client.throttle is get_shared_throttle(stub_server.base_url.split('//')[1])
+    assert Client(base_url='http://localhost:1').throttle is not client.throttle
+
+
+def test_client_throttle_shared_by_threads(stub_server):
+    throttle = Throttle(rate=1000, burst=100, concurrency=3, max_concurrency=3)
+    client = Client(base_url=stub_server.base_url, throttle=throttle)
+    in_flight = []
+    acquire = throttle.acquire
+
+    def spy_acquire():
+        started_at = acquire()
+        in_flight.append(throttle.in_flight)
+        return started_at
+    throttle.acquire = spy_acquire
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(client.get_movie_info_by_id, [1001] * 48))
+
+    assert max(in_flight) == 3
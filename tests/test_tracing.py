@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `allocine.tracing`."""
+
+# To be tested with : python3 -m pytest -vs tests/test_tracing.py
+
+import json
+
+import pytest
+from allocine import Allocine, tracing
+from allocine.cache import MemoryMovieCache
+
+
+@pytest.fixture
+def recorder():
+    recorder = tracing.SpanRecorder()
+    tracing.add_exporter(recorder)
+    yield recorder
+    tracing.remove_exporter(recorder)
+
+
+def test_disabled_tracing():
+    function = print
+    assert not tracing.is_enabled()
+    assert tracing.span('get_theater', theater_id='P0001') is tracing.span('render')
+    assert tracing.propagate(function) is function
+
+
+def test_nested_spans(recorder):
+    with tracing.span('parent', key='value') as parent:
+        with tracing.span('child') as child:
+            child.set_attribute('count', 2)
+        with pytest.raises(ValueError), tracing.span('failing'):
+            raise ValueError
+
+    assert [span.name for span in recorder.spans] == ['child', 'failing', 'parent']
+    assert child.parent_id == parent.span_id
+    assert child.trace_id == parent.trace_id == parent.span_id
+    assert child.attributes == {'count': 2}
+    assert recorder.get_spans('failing')[0].error == 'ValueError'
+    assert parent.duration >= child.duration
+
+
+@pytest.mark.parametrize('max_workers, movie_parent', [(1, 'parse_theaters'), (4, 'prefetch_movie_infos')])
+def test_get_theater_spans(stub_server, recorder, max_workers, movie_parent):
+    allocine = Allocine(base_url=stub_server.base_url, max_workers=max_workers, movie_cache=MemoryMovieCache())
+    allocine.get_theater('P0001')
+
+    spans = {span.span_id: span for span in recorder.spans}
+    get_theater = recorder.get_spans('get_theater')[0]
+    assert get_theater.attributes == {'theater_id': 'P0001'}
+    assert {span.trace_id for span in recorder.spans} == {get_theater.span_id}
+
+    fetches = recorder.get_spans('fetch_movie_info')
+    assert sorted(span.attributes['movie_id'] for span in fetches) == [1001, 1002, 1003]
+    assert {spans[span.parent_id].name for span in fetches} == {movie_parent}
+    requests = recorder.get_spans('request')
+    assert len(requests) == 4
+    assert {spans[span.parent_id].name for span in requests} == {'get_theater', 'fetch_movie_info'}
+    assert {span.attributes['status'] for span in requests} == {200}
+
+
+def test_json_lines_exporter(tmp_path):
+    exporter = tracing.JsonLinesExporter(tmp_path / 'spans.jsonl')
+    tracing.add_exporter(exporter)
+    try:
+        with tracing.span('parent'):
+            with tracing.span('child', movie_id=1001):
+                pass
+    finally:
+        tracing.remove_exporter(exporter)
+
+    with open(tmp_path / 'spans.jsonl', encoding='utf-8') as spans_file:
+        spans = [json.loads(line) for line in spans_file]
+    assert [span['name'] for span in spans] == ['child', 'parent']
+    assert spans[0]['attributes'] == {'movie_id': 1001}
+    assert spans[0]['parent_id'] == spans[1]['span_id']
+
+
+def test_profile_call(tmp_path):
+    result, stats = tracing.profile_call(sorted, [3, 1, 2], dump_path=tmp_path / 'sorted.pstats', reverse=True)
+
+    assert result == [3, 2, 1]
+    assert stats.total_calls > 0
+    assert (tmp_path / 'sorted.pstats').exists()